@@ -1,15 +1,43 @@
 import requests
 import json
 import time
+import os
+import gzip
+import pickle
+import zlib
+import hashlib
 import math
+import bisect
+import numpy as np
 import pandas as pd
 import xlsxwriter
-from datetime import datetime, timedelta
+from xlsxwriter.utility import xl_col_to_name
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, field
-from collections import defaultdict
+from dataclasses import dataclass, field, fields, MISSING
+from collections import defaultdict, deque
 import asyncio
+import codecs
+import re
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+from multiprocessing import shared_memory
 import aiohttp
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # Optional fast JSON backend
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Optional streaming JSON backend
+    ijson = None
 
 @dataclass
 class EnhancedTelemetryData:
@@ -80,84 +108,2838 @@ class EnhancedTelemetryData:
     # Raw message data
     raw_parameters: Dict[str, Any] = field(default_factory=dict)
 
+
+def _lazy_container(name, factory):
+    """Property for a container field of CompactTelemetryData, created on first access"""
+    slot = '_' + name
+
+    def get(self):
+        value = getattr(self, slot)
+        if value is None:
+            value = factory()
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value):
+        setattr(self, slot, value)
+
+    return property(get, set)
+
+
+class CompactTelemetryData:
+    """Slotted counterpart of EnhancedTelemetryData
+
+    Has the same attributes, but the dict and list fields are only created
+    the first time they are accessed, and ``raw_parameters`` is shared with
+    the source message instead of being copied. The message time is kept as
+    epoch seconds in ``t``; ``timestamp`` converts it to a UTC datetime on
+    access.
+    """
+
+    CONTAINER_FIELDS = tuple(f.name for f in fields(EnhancedTelemetryData) if f.default_factory is not MISSING)
+
+    __slots__ = ('t',) + \
+        tuple(f.name for f in fields(EnhancedTelemetryData) if f.default_factory is MISSING and f.name != 'timestamp') + \
+        tuple('_' + name for name in CONTAINER_FIELDS)
+
+    def __init__(self, timestamp=None, latitude=0.0, longitude=0.0, altitude=0.0, speed=0.0, course=0.0,
+                 satellites=0, hdop=0.0, power_voltage=0.0, battery_voltage=0.0, internal_battery=0.0,
+                 gsm_signal=0, temperature=0.0, engine_on=False, ignition=False, odometer=0.0,
+                 engine_hours=0.0, fuel_level=0.0, fuel_consumption=0.0, rpm=0, coolant_temp=0.0,
+                 oil_pressure=0.0, acceleration=0.0, max_acceleration=0.0, max_braking=0.0,
+                 harsh_acceleration=0, harsh_braking=0, harsh_cornering=0, max_cornering=0.0,
+                 idling_time=0.0, movement_sensor=0, driver_id="0", driver_name="", trip_id="",
+                 digital_inputs=None, digital_outputs=None, analog_inputs=None, custom_sensors=None,
+                 can_data=None, speeding_violations=0, eco_driving_score=0.0, maintenance_alerts=None,
+                 geofence_events=None, raw_parameters=None, t=None):
+        # Basic GPS data
+        self.t = t
+        if timestamp is not None:
+            self.timestamp = timestamp
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.speed = speed
+        self.course = course
+        self.satellites = satellites
+        self.hdop = hdop
+        
+        # Device status
+        self.power_voltage = power_voltage
+        self.battery_voltage = battery_voltage
+        self.internal_battery = internal_battery
+        self.gsm_signal = gsm_signal
+        self.temperature = temperature
+        
+        # Engine and vehicle data
+        self.engine_on = engine_on
+        self.ignition = ignition
+        self.odometer = odometer
+        self.engine_hours = engine_hours
+        self.fuel_level = fuel_level
+        self.fuel_consumption = fuel_consumption
+        self.rpm = rpm
+        self.coolant_temp = coolant_temp
+        self.oil_pressure = oil_pressure
+        
+        # Movement and behavior
+        self.acceleration = acceleration
+        self.max_acceleration = max_acceleration
+        self.max_braking = max_braking
+        self.harsh_acceleration = harsh_acceleration
+        self.harsh_braking = harsh_braking
+        self.harsh_cornering = harsh_cornering
+        self.max_cornering = max_cornering
+        self.idling_time = idling_time
+        self.movement_sensor = movement_sensor
+        
+        # Driver and trip data
+        self.driver_id = driver_id
+        self.driver_name = driver_name
+        self.trip_id = trip_id
+        
+        # Enhanced fields
+        self.speeding_violations = speeding_violations
+        self.eco_driving_score = eco_driving_score
+        
+        # Containers stay None until first use
+        self._digital_inputs = digital_inputs
+        self._digital_outputs = digital_outputs
+        self._analog_inputs = analog_inputs
+        self._custom_sensors = custom_sensors
+        self._can_data = can_data
+        self._maintenance_alerts = maintenance_alerts
+        self._geofence_events = geofence_events
+        self._raw_parameters = raw_parameters
+
+    digital_inputs = _lazy_container('digital_inputs', dict)
+    digital_outputs = _lazy_container('digital_outputs', dict)
+    analog_inputs = _lazy_container('analog_inputs', dict)
+    custom_sensors = _lazy_container('custom_sensors', dict)
+    can_data = _lazy_container('can_data', dict)
+    maintenance_alerts = _lazy_container('maintenance_alerts', list)
+    geofence_events = _lazy_container('geofence_events', list)
+    raw_parameters = _lazy_container('raw_parameters', dict)
+
+    @property
+    def timestamp(self):
+        """Message time as a timezone-aware UTC datetime, or None"""
+        return datetime.fromtimestamp(self.t, timezone.utc) if self.t is not None else None
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self.t = int(value.timestamp()) if value is not None else None
+
+    def peek(self, name):
+        """Return a container field without creating it (None if it was never used)"""
+        return getattr(self, '_' + name)
+
+    def to_dict(self):
+        """Field dict matching dataclasses.asdict() of EnhancedTelemetryData"""
+        values = {}
+        for f in fields(EnhancedTelemetryData):
+            value = getattr(self, f.name)
+            values[f.name] = value.copy() if isinstance(value, (dict, list)) else value
+        return values
+
+    def __eq__(self, other):
+        if not isinstance(other, (CompactTelemetryData, EnhancedTelemetryData)):
+            return NotImplemented
+        return self.to_dict() == (other.to_dict() if isinstance(other, CompactTelemetryData)
+                                  else {f.name: getattr(other, f.name) for f in fields(EnhancedTelemetryData)})
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"CompactTelemetryData(timestamp={self.timestamp!r}, speed={self.speed!r}, odometer={self.odometer!r})"
+
+
+# Wialon message parameters mapped onto EnhancedTelemetryData attributes
+PARAMETER_MAPPING = {
+    # Power and electrical
+    'pwr_ext': 'power_voltage',
+    'pwr_int': 'battery_voltage',
+    'battery': 'battery_voltage',
+    'int_battery': 'internal_battery',
+    'gsm_signal': 'gsm_signal',
+    'gsm_level': 'gsm_signal',
+    'pcb_temp': 'temperature',
+    'temperature': 'temperature',
+    'temp1': 'temperature',
+    
+    # Engine and vehicle - expanded
+    'engine_on': 'engine_on',
+    'ignition': 'ignition',
+    'ign': 'ignition',
+    'acc': 'ignition',
+    'mileage': 'odometer',
+    'odometer': 'odometer',
+    'engine_hours': 'engine_hours',
+    'eh': 'engine_hours',
+    'fuel_level': 'fuel_level',
+    'fuel_lvl': 'fuel_level',
+    'fuel1': 'fuel_level',
+    'fuel_consumption': 'fuel_consumption',
+    'fuel_cons': 'fuel_consumption',
+    'rpm': 'rpm',
+    'engine_rpm': 'rpm',
+    'coolant_temp': 'coolant_temp',
+    'engine_temp': 'coolant_temp',
+    'oil_pressure': 'oil_pressure',
+    'oil_press': 'oil_pressure',
+    
+    # Movement and behavior - expanded
+    'acceleration': 'acceleration',
+    'acc_x': 'acceleration',
+    'max_acceleration': 'max_acceleration',
+    'max_acc': 'max_acceleration',
+    'max_braking': 'max_braking',
+    'max_brake': 'max_braking',
+    'harsh_acceleration': 'harsh_acceleration',
+    'harsh_acc': 'harsh_acceleration',
+    'harsh_braking': 'harsh_braking',
+    'harsh_brake': 'harsh_braking',
+    'harsh_cornering': 'harsh_cornering',
+    'harsh_turn': 'harsh_cornering',
+    'wln_crn_max': 'max_cornering',
+    'cornering': 'max_cornering',
+    'idling_time': 'idling_time',
+    'idle_time': 'idling_time',
+    'movement_sens': 'movement_sensor',
+    'movement': 'movement_sensor',
+    
+    # Driver and trip
+    'avl_driver': 'driver_id',
+    'driver_code': 'driver_id',
+    'driver_id': 'driver_id',
+    'trip_id': 'trip_id',
+    'trip': 'trip_id',
+    
+    # Additional vehicle parameters
+    'door_1': 'digital_inputs',
+    'door_2': 'digital_inputs',
+    'panic': 'digital_inputs',
+    'sos': 'digital_inputs',
+    'tilt': 'analog_inputs',
+    'vibration': 'analog_inputs',
+    'ext_temp': 'analog_inputs',
+    'humidity': 'analog_inputs',
+}
+
+_DIGITAL_INPUT_KEYS = ('panic', 'sos', 'alarm')
+_ANALOG_INPUT_KEYS = ('tilt', 'vibration', 'ext_temp', 'humidity', 'pressure')
+_UNMAPPED_PARAMETER = (None, None, None, None)
+
+_FIELD_DEFAULTS = {f.name: f.default for f in fields(EnhancedTelemetryData) if f.default_factory is MISSING}
+
+
+class _scaled:
+    """Unit conversion multiplying numeric parameter values by ``factor``
+
+    A class rather than a closure so device profiles can be pickled to
+    parser worker processes.
+    """
+
+    __slots__ = ('factor',)
+
+    def __init__(self, factor):
+        self.factor = factor
+
+    def __call__(self, value):
+        return value * self.factor if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+    def __eq__(self, other):
+        return isinstance(other, _scaled) and other.factor == self.factor
+
+    def __hash__(self):
+        return hash(self.factor)
+
+    def __repr__(self):
+        return f"_scaled({self.factor!r})"
+
+
+@dataclass
+class DeviceProfile:
+    """Exact parameter layout of one hardware family
+
+    ``parameters`` maps a parameter name to (EnhancedTelemetryData attribute,
+    conversion or None). Units whose Wialon hardware type name contains one
+    of ``hw_patterns`` (case-insensitive) are parsed with this map only;
+    the generic PARAMETER_MAPPING aliases are not consulted.
+    """
+    name: str
+    hw_patterns: tuple
+    parameters: Dict[str, tuple]
+
+
+# Device profiles checked in order; units that match none use PARAMETER_MAPPING
+DEVICE_PROFILES: List[DeviceProfile] = [
+    DeviceProfile(
+        name='teltonika',
+        hw_patterns=('teltonika',),
+        parameters={
+            'pwr_ext': ('power_voltage', _scaled(1000)),  # V -> mV
+            'pwr_int': ('battery_voltage', _scaled(1000)),  # V -> mV
+            'io_66': ('power_voltage', None),  # External voltage, mV
+            'io_67': ('battery_voltage', None),  # Battery voltage, mV
+            'io_21': ('gsm_signal', None),
+            'io_72': ('temperature', _scaled(0.1)),  # Dallas temperature 1, 0.1 °C
+            'io_239': ('ignition', None),
+            'io_240': ('movement_sensor', None),
+            'io_16': ('odometer', None),  # Total odometer, m
+            'io_84': ('fuel_level', _scaled(0.1)),  # CAN fuel level, 0.1 L
+            'io_85': ('rpm', None),
+            'io_78': ('driver_id', None),  # iButton
+            'avl_driver': ('driver_id', None),
+        },
+    ),
+]
+
+
+def register_device_profile(profile):
+    """Add a device profile, taking precedence over the built-in ones"""
+    DEVICE_PROFILES.insert(0, profile)
+
+
+def device_profile_for(hw_name):
+    """Device profile for a Wialon hardware type name, or None for the generic mapping"""
+    hw_name = (hw_name or '').lower()
+    for profile in DEVICE_PROFILES:
+        if any(pattern in hw_name for pattern in profile.hw_patterns):
+            return profile
+    return None
+
+
+def _classify_parameter(key, profile=None):
+    """Classify a message parameter once as (attribute, attribute_converter, container, converter)"""
+    if profile is not None:
+        attr, attr_converter = profile.parameters.get(key, (None, None))
+    else:
+        attr, attr_converter = PARAMETER_MAPPING.get(key), None
+        if attr in ('digital_inputs', 'analog_inputs'):
+            attr = None
+    if attr in ('engine_on', 'ignition') and attr_converter is None:
+        attr_converter = bool
+
+    container, converter = None, None
+    if (key.startswith('din') and key[3:].isdigit()) or key.startswith('door') or key in _DIGITAL_INPUT_KEYS:
+        container, converter = 'digital_inputs', bool
+    elif (key.startswith('dout') and key[4:].isdigit()) or key.startswith('relay'):
+        container, converter = 'digital_outputs', bool
+    elif (key.startswith('ain') and key[3:].isdigit()) or key in _ANALOG_INPUT_KEYS:
+        container, converter = 'analog_inputs', float
+    elif key.startswith('can_') or key.startswith('j1939_'):
+        container = 'can_data'
+
+    if attr is None and container is None:
+        return _UNMAPPED_PARAMETER
+    return attr, attr_converter, container, converter
+
+
+# Tokens of Wialon sensor parameter expressions
+_SENSOR_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d*)?|\.\d+)|(\[[^\]]+\])|([A-Za-z_][A-Za-z0-9_]*)|(.))")
+
+
+def _sensor_expression_tokens(expression):
+    tokens = []
+    for number, reference, name, symbol in _SENSOR_TOKEN.findall(expression):
+        if number:
+            tokens.append(('number', float(number)))
+        elif reference:
+            tokens.append(('sensor', reference[1:-1].strip()))
+        elif name:
+            tokens.append(('param', name))
+        elif symbol.strip():
+            if symbol not in '+-*/^():':
+                raise ValueError(f"unsupported symbol {symbol!r} in {expression!r}")
+            tokens.append(('op', symbol))
+    return tokens
+
+
+def _compile_sensor_expression(expression):
+    """Compile a sensor parameter expression into a function of (param, sensor_values)
+
+    Supports numbers, parameter names, ``param:N`` bit extraction,
+    ``[Sensor name]`` references, + - * / ^ and parentheses. The compiled
+    function returns a float array over all messages.
+    """
+    tokens = _sensor_expression_tokens(expression)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def take(kind=None, value=None):
+        nonlocal position
+        token = peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            raise ValueError(f"unexpected {token[1]!r} in {expression!r}")
+        position += 1
+        return token
+
+    def atom():
+        kind, value = peek()
+        if kind == 'op' and value == '(':
+            take()
+            inner = additive()
+            take('op', ')')
+            return inner
+        if kind == 'op' and value == '-':
+            take()
+            operand = atom()
+            return lambda param, sensors: -operand(param, sensors)
+        if kind == 'number':
+            take()
+            return lambda param, sensors: value
+        if kind == 'sensor':
+            take()
+            return lambda param, sensors: sensors.get(value, np.nan)
+        if kind == 'param':
+            take()
+            if peek() == ('op', ':'):
+                take()
+                bit = int(take('number')[1])
+
+                def extract_bit(param, sensors, name=value, bit=bit):
+                    raw = param(name)
+                    valid = np.isfinite(raw)
+                    bits = (np.where(valid, raw, 0).astype(np.int64) >> bit) & 1
+                    return np.where(valid, bits, np.nan)
+                return extract_bit
+            return lambda param, sensors: param(value)
+        raise ValueError(f"unexpected {value!r} in {expression!r}")
+
+    def power():
+        base = atom()
+        if peek() == ('op', '^'):
+            take()
+            exponent = power()
+            return lambda param, sensors: np.power(base(param, sensors), exponent(param, sensors))
+        return base
+
+    def multiplicative():
+        left = power()
+        while peek() in (('op', '*'), ('op', '/')):
+            operator = take()[1]
+            right = power()
+            if operator == '*':
+                left = (lambda a, b: lambda param, sensors: a(param, sensors) * b(param, sensors))(left, right)
+            else:
+                left = (lambda a, b: lambda param, sensors: np.divide(a(param, sensors), b(param, sensors)))(left, right)
+        return left
+
+    def additive():
+        left = multiplicative()
+        while peek() in (('op', '+'), ('op', '-')):
+            operator = take()[1]
+            right = multiplicative()
+            if operator == '+':
+                left = (lambda a, b: lambda param, sensors: a(param, sensors) + b(param, sensors))(left, right)
+            else:
+                left = (lambda a, b: lambda param, sensors: a(param, sensors) - b(param, sensors))(left, right)
+        return left
+
+    compiled = additive()
+    if position != len(tokens):
+        raise ValueError(f"unexpected {peek()[1]!r} in {expression!r}")
+    return compiled
+
+
+def _compile_calibration_table(table):
+    """Compile a Wialon calibration table (rows of x, a, b meaning y = a*x + b from x on)"""
+    rows = sorted((float(row['x']), float(row.get('a', 1)), float(row.get('b', 0)))
+                  for row in table or [] if 'x' in row)
+    if not rows:
+        return None
+    xs, slopes, offsets = (np.array(column) for column in zip(*rows))
+
+    def calibrate(values):
+        segment = np.clip(np.searchsorted(xs, values, side='right') - 1, 0, len(xs) - 1)
+        return slopes[segment] * values + offsets[segment]
+    return calibrate
+
+
+def _sensor_bounds(config):
+    """Lower and upper validity bounds from a sensor's ``c`` config JSON (None when unset)"""
+    if isinstance(config, str):
+        try:
+            config = json.loads(config) if config else {}
+        except ValueError:
+            config = {}
+    if not isinstance(config, dict):
+        config = {}
+    bounds = []
+    for key in ('lower_bound', 'upper_bound'):
+        try:
+            bounds.append(float(config[key]) if config.get(key) not in (None, '') else None)
+        except (TypeError, ValueError):
+            bounds.append(None)
+    return tuple(bounds)
+
+
+@dataclass
+class CompiledSensor:
+    """One unit sensor ready for evaluation over message arrays"""
+    name: str
+    sensor_type: str
+    expression: Any
+    calibrate: Any = None
+    lower_bound: Optional[float] = None
+    upper_bound: Optional[float] = None
+    parameter: Optional[str] = None  # set when the expression is a bare parameter name
+
+
+def _sensor_missing(column):
+    """Boolean array marking the rows of a sensor column without a value"""
+    if column.dtype.kind == 'f':
+        return np.isnan(column)
+    if column.dtype == object:
+        return np.array([value is None or (isinstance(value, float) and math.isnan(value))
+                         for value in column], dtype=bool)
+    return np.zeros(len(column), dtype=bool)
+
+
+def _sensor_numeric(column):
+    """Float values of a sensor column, NaN where missing or not numeric"""
+    if column.dtype.kind == 'f':
+        return column
+    if column.dtype.kind in 'biu':
+        return column.astype(np.float64)
+    return np.array([_numeric_value(value) for value in column], dtype=np.float64)
+
+
+class SensorEngine:
+    """A unit's Wialon sensors compiled once and evaluated over whole message arrays
+
+    Each sensor's parameter expression, calibration table and validity bounds
+    are compiled when the engine is built. evaluate() returns one array per
+    sensor: floats with NaN where the value is missing or out of bounds, or
+    the parameter's raw values for sensors that just read one parameter.
+    """
+
+    # Sensor types whose calibrated values fill EnhancedTelemetryData fields
+    FIELD_SENSOR_TYPES = {'fuel level': 'fuel_level', 'temperature': 'temperature'}
+
+    def __init__(self, sensors=None):
+        self.sensors = []
+        for sensor_id, sensor_info in (sensors or {}).items():
+            sensor_name = sensor_info.get('n', f'sensor_{sensor_id}')
+            expression = sensor_info.get('p', '')
+            if not expression:
+                continue
+            try:
+                compiled = _compile_sensor_expression(expression)
+                calibrate = _compile_calibration_table(sensor_info.get('tbl'))
+                tokens = _sensor_expression_tokens(expression)
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"   ⚠️ Skipping sensor {sensor_name}: {e}")
+                continue
+            parameter = tokens[0][1] if len(tokens) == 1 and tokens[0][0] == 'param' else None
+            lower_bound, upper_bound = _sensor_bounds(sensor_info.get('c'))
+            self.sensors.append(CompiledSensor(sensor_name, sensor_info.get('t', ''), compiled,
+                                               calibrate, lower_bound, upper_bound, parameter))
+
+    def __bool__(self):
+        return bool(self.sensors)
+
+    def evaluate(self, param, length, raw=None):
+        """Sensor name -> value array, given ``param(name)`` returning a float array (NaN if absent)
+
+        With ``raw(name)`` returning a parameter's (values, presence) arrays,
+        or None if no message has it, sensors reading a bare parameter keep
+        its raw values: integers, digital states and text come through as
+        sent, except that numeric readings of calibrated sensors are
+        calibrated floats. Everything else is a float array.
+        """
+        columns = {}
+
+        def cached_param(name):
+            if name not in columns:
+                columns[name] = param(name)
+            return columns[name]
+
+        values = {}
+        outputs = {}
+        with np.errstate(all='ignore'):
+            for sensor in self.sensors:
+                value = np.broadcast_to(np.asarray(sensor.expression(cached_param, values), dtype=np.float64),
+                                        (length,)).copy()
+                if sensor.calibrate is not None:
+                    value = sensor.calibrate(value)
+                if sensor.lower_bound is not None:
+                    value[value < sensor.lower_bound] = np.nan
+                if sensor.upper_bound is not None:
+                    value[value > sensor.upper_bound] = np.nan
+                value[~np.isfinite(value)] = np.nan
+                output = value
+                raw_column = raw(sensor.parameter) if raw is not None and sensor.parameter is not None else None
+                if raw_column is not None:
+                    output = self._raw_output(sensor, value, cached_param(sensor.parameter), *raw_column)
+                if sensor.name in values:
+                    value = np.where(np.isnan(value), values[sensor.name], value)
+                    missing = _sensor_missing(output)
+                    if missing.any():
+                        previous = outputs[sensor.name]
+                        if output.dtype.kind == 'f' and previous.dtype.kind == 'f':
+                            output = np.where(missing, previous, output)
+                        else:
+                            output = output.astype(object)
+                            output[missing] = previous.astype(object)[missing]
+                values[sensor.name] = value
+                outputs[sensor.name] = output
+        return outputs
+
+    @staticmethod
+    def _raw_output(sensor, value, numeric, raw_values, present):
+        """A bare-parameter sensor's column: raw values where no calibration applies"""
+        text = present & np.isnan(numeric)
+        if sensor.calibrate is not None:
+            if not text.any():
+                return value
+            output = value.astype(object)
+            output[text] = raw_values[text]
+            return output
+        if raw_values.dtype.kind == 'f':
+            return value
+        kept = present & (text | ~np.isnan(value))
+        if kept.all() and raw_values.dtype != object:
+            return raw_values
+        output = np.full(len(value), None, dtype=object)
+        output[kept] = raw_values[kept]
+        return output
+
+    def field_values(self, values):
+        """Telemetry field -> calibrated array from the fuel level (summed) and temperature sensors"""
+        fields_values = {}
+        for sensor in self.sensors:
+            field_name = self.FIELD_SENSOR_TYPES.get(sensor.sensor_type)
+            if field_name is None:
+                continue
+            value = _sensor_numeric(values[sensor.name])
+            if field_name not in fields_values:
+                fields_values[field_name] = value
+            elif field_name == 'fuel_level':
+                current = fields_values[field_name]
+                fields_values[field_name] = np.where(np.isnan(current), value,
+                                                     np.where(np.isnan(value), current, current + value))
+            else:
+                current = fields_values[field_name]
+                fields_values[field_name] = np.where(np.isnan(current), value, current)
+        return fields_values
+
+
+def _numeric_value(value):
+    """Float value of a raw parameter for sensor evaluation (NaN if not numeric)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class UnitMessageParser:
+    """Message parser compiled once per unit from its sensor table
+
+    Each parameter name is classified against PARAMETER_MAPPING and the
+    input/output/CAN naming rules the first time it is seen, so a message
+    is parsed in a single pass over its parameters. Custom sensors are
+    computed by the unit's SensorEngine. With a DeviceProfile, attributes
+    come from the profile's exact parameter map instead.
+    """
+
+    def __init__(self, sensors=None, profile=None):
+        self.sensors = sensors
+        self.sensor_engine = SensorEngine(sensors)
+        self.profile = profile
+        self._parameters = {}
+
+    def __reduce__(self):
+        # Compiled sensors are closures; rebuild them from the sensor table on unpickling
+        return UnitMessageParser, (self.sensors, self.profile)
+
+    def parse(self, msg) -> CompactTelemetryData:
+        """Parse a single message into a CompactTelemetryData record"""
+        telemetry = CompactTelemetryData()
+        
+        if not msg or not isinstance(msg, dict):
+            return telemetry
+            
+        # Basic message data
+        telemetry.t = msg.get('t', 0)
+        
+        # Position data
+        pos = msg.get('pos', {})
+        if pos:
+            telemetry.latitude = pos.get('y', 0.0)
+            telemetry.longitude = pos.get('x', 0.0)
+            telemetry.altitude = pos.get('z', 0.0)
+            telemetry.speed = pos.get('s', 0.0)
+            telemetry.course = pos.get('c', 0.0)
+            telemetry.satellites = pos.get('sc', 0)
+            telemetry.hdop = pos.get('hdop', 0.0)
+        
+        # Parameters (shared with the message, not copied)
+        params = msg.get('p', {})
+        telemetry.raw_parameters = params
+        
+        # Single pass over the parameters using the cached classification
+        classified = self._parameters
+        for key, value in params.items():
+            rule = classified.get(key)
+            if rule is None:
+                rule = classified[key] = _classify_parameter(key, self.profile)
+            if rule is _UNMAPPED_PARAMETER:
+                continue
+            attr, attr_converter, container, converter = rule
+            if attr is not None:
+                setattr(telemetry, attr, attr_converter(value) if attr_converter else value)
+            if container is not None:
+                getattr(telemetry, container)[key] = converter(value) if converter else value
+        
+        # Custom sensors - calibrated through the sensor engine, replacing raw fuel level and temperature
+        if self.sensor_engine:
+            sensor_values = self.sensor_engine.evaluate(
+                lambda name: np.array([_numeric_value(params[name]) if name in params else np.nan]), 1,
+                lambda name: (_column_array([params[name]], object), np.ones(1, dtype=bool)) if name in params else None)
+            for sensor_name, value in sensor_values.items():
+                if not _sensor_missing(value)[0]:
+                    value = value[0]
+                    telemetry.custom_sensors[sensor_name] = value.item() if isinstance(value, np.generic) else value
+            for field_name, value in self.sensor_engine.field_values(sensor_values).items():
+                setattr(telemetry, field_name, _FIELD_DEFAULTS[field_name] if np.isnan(value[0]) else float(value[0]))
+        
+        # Calculate derived metrics
+        telemetry.speeding_violations = 1 if telemetry.speed > 80 else 0  # Configurable threshold
+        
+        # Calculate eco-driving score (simplified)
+        eco_score = 100
+        if telemetry.harsh_acceleration > 0:
+            eco_score -= (telemetry.harsh_acceleration * 5)
+        if telemetry.harsh_braking > 0:
+            eco_score -= (telemetry.harsh_braking * 5)
+        if telemetry.harsh_cornering > 0:
+            eco_score -= (telemetry.harsh_cornering * 3)
+        if telemetry.speed > 100:
+            eco_score -= 10
+        telemetry.eco_driving_score = max(0, eco_score)
+        
+        # Check for maintenance alerts
+        if telemetry.engine_hours > 0 and telemetry.engine_hours % 100 < 1:  # Every 100 hours
+            telemetry.maintenance_alerts.append("Engine maintenance due")
+        if telemetry.odometer > 0 and telemetry.odometer % 10000 < 100:  # Every 10000 km
+            telemetry.maintenance_alerts.append("Vehicle service due")
+        if telemetry.fuel_level < 10:
+            telemetry.maintenance_alerts.append("Low fuel level")
+        if telemetry.power_voltage < 11000:  # Below 11V
+            telemetry.maintenance_alerts.append("Low battery voltage")
+        
+        return telemetry
+
+    def parse_batch(self, messages) -> 'TelemetryFrame':
+        """Parse a list of raw messages straight into a TelemetryFrame
+
+        Produces the same frame as packing parse() results, but fills column
+        lists directly and computes the derived fields (speeding, eco score,
+        maintenance alerts) as array operations.
+        """
+        messages = list(messages)
+        count = len(messages)
+        valid = np.zeros(count, dtype=bool)
+        t = [NO_TIMESTAMP] * count
+        latitude, longitude, altitude, speed, course = ([0.0] * count for _ in range(5))
+        satellites, hdop = [0] * count, [0.0] * count
+        values = {}
+        sparse = {name: {} for name in TelemetryFrame.SPARSE_FIELDS}
+        raw_parameters = {}
+        classified = self._parameters
+
+        for row, msg in enumerate(messages):
+            if not msg or not isinstance(msg, dict):
+                continue
+            valid[row] = True
+            t[row] = msg.get('t', 0)
+
+            pos = msg.get('pos', {})
+            if pos:
+                latitude[row] = pos.get('y', 0.0)
+                longitude[row] = pos.get('x', 0.0)
+                altitude[row] = pos.get('z', 0.0)
+                speed[row] = pos.get('s', 0.0)
+                course[row] = pos.get('c', 0.0)
+                satellites[row] = pos.get('sc', 0)
+                hdop[row] = pos.get('hdop', 0.0)
+
+            params = msg.get('p', {})
+            for key, value in params.items():
+                entry = raw_parameters.get(key)
+                if entry is None:
+                    entry = raw_parameters[key] = ([], [])
+                entry[0].append(row)
+                entry[1].append(value)
+
+                rule = classified.get(key)
+                if rule is None:
+                    rule = classified[key] = _classify_parameter(key, self.profile)
+                if rule is _UNMAPPED_PARAMETER:
+                    continue
+                attr, attr_converter, container, converter = rule
+                if attr is not None:
+                    column = values.get(attr)
+                    if column is None:
+                        column = values[attr] = [_FIELD_DEFAULTS[attr]] * count
+                    column[row] = attr_converter(value) if attr_converter else value
+                if container is not None:
+                    row_values = sparse[container].get(row)
+                    if row_values is None:
+                        row_values = sparse[container][row] = {}
+                    row_values[key] = converter(value) if converter else value
+
+        values.update(latitude=latitude, longitude=longitude, altitude=altitude, speed=speed,
+                      course=course, satellites=satellites, hdop=hdop)
+        columns = {'t': np.array(t, dtype=np.int64)}
+        for name in TelemetryFrame.SCALAR_FIELDS:
+            text = name in TelemetryFrame.TEXT_FIELDS
+            column = values.get(name)
+            if column is not None:
+                columns[name] = _column_array(column, object if text else None)
+            else:
+                columns[name] = np.full(count, _FIELD_DEFAULTS[name], dtype=object if text else None)
+
+        # Custom sensors over the parameter columns; a unit's fuel level and temperature
+        # sensors replace the raw mapped values (rows without a valid reading get the default)
+        parameters = ParameterStore.from_entries(count, raw_parameters)
+        sensor_columns = {}
+        if self.sensor_engine:
+            sensor_columns = self.sensor_engine.evaluate(
+                parameters.numeric, count,
+                lambda name: (parameters.column(name), parameters.presence(name)) if name in parameters.columns else None)
+            for field_name, value in self.sensor_engine.field_values(sensor_columns).items():
+                columns[field_name] = np.where(np.isnan(value), _FIELD_DEFAULTS[field_name], value)
+
+        # Derived fields, left at their defaults for rows that were not messages
+        speed = columns['speed']
+        columns['speeding_violations'] = np.where(valid & (speed > 80), 1, 0)  # Configurable threshold
+
+        eco_score = np.full(count, 100)
+        for name, weight in (('harsh_acceleration', 5), ('harsh_braking', 5), ('harsh_cornering', 3)):
+            events = columns[name]
+            eco_score = eco_score - np.where(events > 0, events * weight, 0)
+        eco_score = np.maximum(eco_score - np.where(speed > 100, 10, 0), 0)
+        if not valid.all():
+            eco_score = np.where(valid, eco_score, _FIELD_DEFAULTS['eco_driving_score'])
+        columns['eco_driving_score'] = eco_score
+
+        engine_hours, odometer = columns['engine_hours'], columns['odometer']
+        alert_conditions = (
+            (engine_hours > 0) & (engine_hours % 100 < 1),  # Every 100 hours
+            (odometer > 0) & (odometer % 10000 < 100),  # Every 10000 km
+            columns['fuel_level'] < 10,
+            columns['power_voltage'] < 11000,  # Below 11V
+        )
+        alerts = np.zeros(count, dtype=np.uint8)
+        for bit, condition in enumerate(alert_conditions):
+            alerts |= np.where(valid & np.asarray(condition, dtype=bool), 1 << bit, 0).astype(np.uint8)
+        columns['alerts'] = alerts
+
+        return TelemetryFrame(columns, sparse, {}, count, parameters, sensor_columns)
+
+
+# Alerts raised by the parser, stored in TelemetryFrame as bits of one column
+MAINTENANCE_ALERTS = (
+    "Engine maintenance due",
+    "Vehicle service due",
+    "Low fuel level",
+    "Low battery voltage",
+)
+
+# Messages parsed together into one block of columns
+FRAME_CHUNK_SIZE = 10000
+
+# Marks rows without a timestamp in TelemetryFrame's int64 time column
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def _record_epoch(record):
+    """Epoch seconds of a record, or NO_TIMESTAMP"""
+    if isinstance(record, CompactTelemetryData):
+        return record.t if record.t is not None else NO_TIMESTAMP
+    return int(record.timestamp.timestamp()) if record.timestamp else NO_TIMESTAMP
+
+
+def _record_container(record, name):
+    """Read a dict/list field of a record without creating it on compact records"""
+    if isinstance(record, CompactTelemetryData):
+        return record.peek(name)
+    return getattr(record, name)
+
+
+def _scalar(value):
+    """Convert a NumPy scalar result to the equivalent Python number"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _column_array(values, dtype=None):
+    """Pack a list into a NumPy array, keeping anything non-numeric as objects"""
+    if dtype is object:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    try:
+        array = np.array(values, dtype=dtype)
+    except (TypeError, ValueError, OverflowError):
+        return _column_array(values, object)
+    if array.dtype.kind not in 'biuf':
+        return _column_array(values, object)
+    return array
+
+
+class ParameterStore:
+    """Raw message parameters of a unit stored column-wise
+
+    Every parameter name seen is one column: a typed NumPy array with a
+    value for each row plus a packed presence bitmap, instead of one dict per
+    message. Integer and float values of the same parameter share a float
+    column, so they come back as floats.
+    """
+
+    def __init__(self, length=0, columns=None):
+        self.length = length
+        self.columns = columns if columns is not None else {}  # name -> (values, packed presence)
+
+    @classmethod
+    def from_entries(cls, length, entries):
+        """Build a store from {name: (rows, values)} collected while parsing"""
+        columns = {}
+        for name, (rows, values) in entries.items():
+            packed = _column_array(values)
+            dense = np.zeros(length, dtype=packed.dtype) if packed.dtype != object \
+                else np.full(length, None, dtype=object)
+            dense[rows] = packed
+            present = np.zeros(length, dtype=bool)
+            present[rows] = True
+            columns[sys.intern(name)] = (dense, np.packbits(present))
+        return cls(length, columns)
+
+    @classmethod
+    def from_dicts(cls, dicts):
+        """Build a store from one parameter dict (or None) per row"""
+        entries = {}
+        for row, params in enumerate(dicts):
+            for name, value in (params or {}).items():
+                entry = entries.get(name)
+                if entry is None:
+                    entry = entries[name] = ([], [])
+                entry[0].append(row)
+                entry[1].append(value)
+        return cls.from_entries(len(dicts), entries)
+
+    @classmethod
+    def concat(cls, stores):
+        """Join stores end to end, padding parameters a store lacks as absent"""
+        length = sum(store.length for store in stores)
+        names = list(dict.fromkeys(name for store in stores for name in store.columns))
+        columns = {}
+        for name in names:
+            dtypes = [store.columns[name][0].dtype for store in stores if name in store.columns]
+            dtype = object if object in dtypes else np.result_type(*dtypes)
+            values, present = [], []
+            for store in stores:
+                if name in store.columns:
+                    store_values, store_present = store.columns[name]
+                    values.append(store_values.astype(dtype, copy=False))
+                    present.append(np.unpackbits(store_present, count=store.length).astype(bool))
+                else:
+                    values.append(np.zeros(store.length, dtype=dtype) if dtype != object
+                                  else np.full(store.length, None, dtype=object))
+                    present.append(np.zeros(store.length, dtype=bool))
+            columns[name] = (np.concatenate(values), np.packbits(np.concatenate(present)))
+        return cls(length, columns)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def names(self):
+        """Parameter names in the order they were first seen"""
+        return list(self.columns)
+
+    def presence(self, name):
+        """Boolean array marking the rows that carry ``name``"""
+        if name not in self.columns:
+            return np.zeros(self.length, dtype=bool)
+        return np.unpackbits(self.columns[name][1], count=self.length).astype(bool)
+
+    def column(self, name):
+        """Values of ``name`` for every row (only meaningful where presence() is True)"""
+        return self.columns[name][0]
+
+    def numeric(self, name):
+        """Float values of ``name`` for every row, NaN where absent or not numeric"""
+        if name not in self.columns:
+            return np.full(self.length, np.nan)
+        values = self.columns[name][0]
+        if values.dtype.kind in 'biuf':
+            numeric = values.astype(np.float64)
+        else:
+            numeric = np.array([_numeric_value(value) for value in values], dtype=np.float64)
+        numeric[~self.presence(name)] = np.nan
+        return numeric
+
+    def raw_param(self, index, name, default=None):
+        """Value of parameter ``name`` in row ``index``, or ``default`` if the message lacked it"""
+        column = self.columns.get(name)
+        if column is None:
+            return default
+        if index < 0:
+            index += self.length
+        values, present = column
+        if not (present[index >> 3] >> (7 - (index & 7))) & 1:
+            return default
+        value = values[index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def row_dict(self, index):
+        """Rebuild the parameter dict of one message"""
+        if index < 0:
+            index += self.length
+        byte, bit = index >> 3, 7 - (index & 7)
+        params = {}
+        for name, (values, present) in self.columns.items():
+            if (present[byte] >> bit) & 1:
+                value = values[index]
+                params[name] = value.item() if isinstance(value, np.generic) else value
+        return params
+
+    def take(self, rows):
+        """New store holding the given rows"""
+        columns = {}
+        for name, (values, present) in self.columns.items():
+            row_present = np.unpackbits(present, count=self.length).astype(bool)[rows]
+            if row_present.any():
+                columns[name] = (values[rows], np.packbits(row_present))
+        return ParameterStore(len(rows), columns)
+
+
+class TelemetryFrame:
+    """Columnar store for a unit's telemetry
+
+    Scalar fields of EnhancedTelemetryData are NumPy columns, timestamps are
+    int64 unix seconds in ``t`` and maintenance alerts are a bitmask column.
+    The dict and list fields are kept sparsely as {row: value} for the rows
+    where they are non-empty, except raw parameters, which live in a
+    ParameterStore, and custom sensors, which are one column per sensor
+    (NaN or None where a row has no value). Indexing with an int returns an
+    EnhancedTelemetryData record, with a column name the column, and with a
+    slice or index array a new frame.
+    """
+
+    SCALAR_FIELDS = tuple(f.name for f in fields(EnhancedTelemetryData)
+                          if f.name != 'timestamp' and f.default_factory is MISSING)
+    TEXT_FIELDS = tuple(f.name for f in fields(EnhancedTelemetryData) if isinstance(f.default, str))
+    SPARSE_FIELDS = tuple(f.name for f in fields(EnhancedTelemetryData)
+                          if f.default_factory is not MISSING
+                          and f.name not in ('maintenance_alerts', 'raw_parameters', 'custom_sensors'))
+
+    def __init__(self, columns=None, sparse=None, extra_alerts=None, length=0, parameters=None,
+                 sensor_columns=None):
+        self.columns = columns if columns is not None else self._empty_columns()
+        self.sparse = sparse if sparse is not None else {name: {} for name in self.SPARSE_FIELDS}
+        self.extra_alerts = extra_alerts if extra_alerts is not None else {}
+        self.length = length
+        self.parameters = parameters if parameters is not None else ParameterStore(length)
+        self.sensor_columns = sensor_columns if sensor_columns is not None else {}
+
+    @classmethod
+    def _empty_columns(cls):
+        columns = {'t': np.empty(0, dtype=np.int64), 'alerts': np.empty(0, dtype=np.uint8)}
+        for name in cls.SCALAR_FIELDS:
+            columns[name] = np.empty(0, dtype=object if name in cls.TEXT_FIELDS else np.float64)
+        return columns
+
+    @classmethod
+    def coerce(cls, telemetry_data):
+        """Return telemetry_data as a frame, packing a list of records if needed"""
+        if isinstance(telemetry_data, cls):
+            return telemetry_data
+        return cls.from_records(list(telemetry_data or []))
+
+    @classmethod
+    def from_records(cls, records):
+        """Pack a list of EnhancedTelemetryData records into a frame"""
+        columns = {
+            't': np.array([_record_epoch(r) for r in records], dtype=np.int64)
+        }
+        for name in cls.SCALAR_FIELDS:
+            columns[name] = _column_array([getattr(r, name) for r in records],
+                                          object if name in cls.TEXT_FIELDS else None)
+
+        sparse = {name: {} for name in cls.SPARSE_FIELDS}
+        for name, values in sparse.items():
+            for row, record in enumerate(records):
+                value = _record_container(record, name)
+                if value:
+                    values[row] = value
+
+        alert_bits = {alert: 1 << bit for bit, alert in enumerate(MAINTENANCE_ALERTS)}
+        alerts = np.zeros(len(records), dtype=np.uint8)
+        extra_alerts = {}
+        for row, record in enumerate(records):
+            for alert in _record_container(record, 'maintenance_alerts') or ():
+                if alert in alert_bits:
+                    alerts[row] |= alert_bits[alert]
+                else:
+                    extra_alerts.setdefault(row, []).append(alert)
+        columns['alerts'] = alerts
+
+        parameters = ParameterStore.from_dicts([_record_container(r, 'raw_parameters') for r in records])
+
+        sensor_rows = [_record_container(r, 'custom_sensors') or {} for r in records]
+        sensor_columns = {}
+        for name in dict.fromkeys(name for row in sensor_rows for name in row):
+            values = [row.get(name) for row in sensor_rows]
+            if all(value is None or isinstance(value, float) for value in values):
+                sensor_columns[name] = np.array([np.nan if value is None else value for value in values])
+            else:
+                sensor_columns[name] = _column_array(values, object)
+
+        return cls(columns, sparse, extra_alerts, len(records), parameters, sensor_columns)
+
+    @classmethod
+    def concat(cls, frames):
+        """Join frames end to end into a new frame"""
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return cls()
+        if len(frames) == 1:
+            return frames[0]
+
+        columns = {}
+        for name in frames[0].columns:
+            parts = [frame.columns[name] for frame in frames]
+            if any(part.dtype == object for part in parts):
+                parts = [part.astype(object) for part in parts]
+            columns[name] = np.concatenate(parts)
+
+        sparse = {name: {} for name in cls.SPARSE_FIELDS}
+        extra_alerts = {}
+        offset = 0
+        for frame in frames:
+            for name, values in frame.sparse.items():
+                sparse[name].update((row + offset, value) for row, value in values.items())
+            extra_alerts.update((row + offset, value) for row, value in frame.extra_alerts.items())
+            offset += len(frame)
+
+        parameters = ParameterStore.concat([frame.parameters for frame in frames])
+
+        sensor_columns = {}
+        for name in dict.fromkeys(name for frame in frames for name in frame.sensor_columns):
+            parts = [frame.sensor_columns.get(name, np.full(len(frame), np.nan)) for frame in frames]
+            if len({part.dtype.kind for part in parts}) > 1 or any(part.dtype == object for part in parts):
+                parts = [part.astype(object) for part in parts]
+            sensor_columns[name] = np.concatenate(parts)
+
+        return cls(columns, sparse, extra_alerts, offset, parameters, sensor_columns)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for row in range(self.length):
+            yield self.record(row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += self.length
+            if not 0 <= key < self.length:
+                raise IndexError("TelemetryFrame index out of range")
+            return self.record(int(key))
+        if isinstance(key, slice):
+            return self.take(np.arange(self.length)[key])
+        return self.take(np.asarray(key))
+
+    def take(self, rows):
+        """New frame holding the given rows (an index or boolean array)"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        columns = {name: column[rows] for name, column in self.columns.items()}
+        positions = {int(old): new for new, old in enumerate(rows)}
+        sparse = {name: {positions[row]: value for row, value in values.items() if row in positions}
+                  for name, values in self.sparse.items()}
+        extra_alerts = {positions[row]: value for row, value in self.extra_alerts.items() if row in positions}
+        sensor_columns = {name: column[rows] for name, column in self.sensor_columns.items()}
+        return TelemetryFrame(columns, sparse, extra_alerts, len(rows), self.parameters.take(rows), sensor_columns)
+
+    def record(self, row):
+        """Materialise one row as an EnhancedTelemetryData record"""
+        values = {name: self.columns[name][row] for name in self.SCALAR_FIELDS}
+        values = {name: value.item() if isinstance(value, np.generic) else value
+                  for name, value in values.items()}
+        t = int(self.columns['t'][row])
+        values['timestamp'] = datetime.fromtimestamp(t, timezone.utc) if t != NO_TIMESTAMP else None
+        for name, sparse_values in self.sparse.items():
+            if row in sparse_values:
+                values[name] = sparse_values[row]
+        values['maintenance_alerts'] = self.row_alerts(row)
+        values['raw_parameters'] = self.parameters.row_dict(row)
+        values['custom_sensors'] = self.row_sensors(row)
+        return EnhancedTelemetryData(**values)
+
+    def row_sensors(self, row):
+        """Custom sensor values of one row"""
+        sensors = {}
+        for name, column in self.sensor_columns.items():
+            value = column[row]
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            sensors[name] = value.item() if isinstance(value, np.generic) else value
+        return sensors
+
+    def timestamps(self, tz=None):
+        """All message times as a timezone-aware DatetimeIndex (UTC unless ``tz`` is given)
+
+        Rows without a timestamp come back as NaT.
+        """
+        t = self.columns['t']
+        index = pd.to_datetime(np.where(t == NO_TIMESTAMP, np.nan, t), unit='s', utc=True)
+        return index.tz_convert(tz) if tz is not None else index
+
+    def raw_param(self, row, name, default=None):
+        """Raw parameter ``name`` of one row, or ``default`` if that message lacked it"""
+        return self.parameters.raw_param(row, name, default)
+
+    def row_alerts(self, row):
+        """Maintenance alerts of one row"""
+        mask = int(self.columns['alerts'][row])
+        alerts = [alert for bit, alert in enumerate(MAINTENANCE_ALERTS) if mask & (1 << bit)]
+        return alerts + self.extra_alerts.get(row, [])
+
+    def unique_alerts(self):
+        """Every maintenance alert raised anywhere in the frame"""
+        mask = int(np.bitwise_or.reduce(self.columns['alerts'])) if self.length else 0
+        alerts = {alert for bit, alert in enumerate(MAINTENANCE_ALERTS) if mask & (1 << bit)}
+        for row_alerts in self.extra_alerts.values():
+            alerts.update(row_alerts)
+        return list(alerts)
+
+    def to_records(self):
+        """Materialise every row as EnhancedTelemetryData records"""
+        return list(self)
+
+    def sorted_by_time(self):
+        """The frame in ``t`` order; itself when already sorted"""
+        if self.length < 2 or not (np.diff(self.columns['t']) < 0).any():
+            return self
+        return self.take(np.argsort(self.columns['t'], kind='stable'))
+
+    def to_shared_memory(self):
+        """Copy the frame's numeric arrays into one shared memory block
+
+        Returns a picklable descriptor: the block name, the layout of each
+        array in it and the object-typed columns and sparse fields, which are
+        pickled as usual. The caller owns the block; from_shared_memory()
+        releases it.
+        """
+        arrays, objects = [], {}
+
+        def add(key, array):
+            if array.dtype == object:
+                objects[key] = array
+            else:
+                arrays.append((key, array))
+
+        for name, column in self.columns.items():
+            add(('column', name), column)
+        for name, (values, present) in self.parameters.columns.items():
+            add(('parameter', name), values)
+            add(('present', name), present)
+        for name, column in self.sensor_columns.items():
+            add(('sensor', name), column)
+
+        layout, offset = [], 0
+        for key, array in arrays:
+            layout.append((key, array.dtype.str, len(array), offset))
+            offset += -(-array.nbytes // 8) * 8  # keep every array 8-byte aligned
+
+        block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for (key, dtype, length, start), (_, array) in zip(layout, arrays):
+                np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start)[:] = array
+        except Exception:
+            block.close()
+            block.unlink()
+            raise
+        block.close()
+
+        return {
+            'block': block.name,
+            'layout': layout,
+            'objects': objects,
+            'columns': list(self.columns),
+            'parameters': list(self.parameters.columns),
+            'sensors': list(self.sensor_columns),
+            'sparse': self.sparse,
+            'extra_alerts': self.extra_alerts,
+            'length': self.length,
+        }
+
+    @classmethod
+    def from_shared_memory(cls, descriptor):
+        """Rebuild a frame written by to_shared_memory() and release its block"""
+        block = shared_memory.SharedMemory(name=descriptor['block'])
+        try:
+            arrays = {key: np.ndarray(length, dtype=dtype, buffer=block.buf, offset=start).copy()
+                      for key, dtype, length, start in descriptor['layout']}
+        finally:
+            block.close()
+            block.unlink()
+        arrays.update(descriptor['objects'])
+
+        length = descriptor['length']
+        columns = {name: arrays[('column', name)] for name in descriptor['columns']}
+        parameters = ParameterStore(length, {name: (arrays[('parameter', name)], arrays[('present', name)])
+                                             for name in descriptor['parameters']})
+        sensor_columns = {name: arrays[('sensor', name)] for name in descriptor['sensors']}
+        return cls(columns, descriptor['sparse'], descriptor['extra_alerts'], length, parameters,
+                   sensor_columns)
+
+    def to_state(self):
+        """The frame as plain data: a list of numeric arrays and a JSON-serializable description
+
+        Object-typed columns, sparse fields and extra alerts go into the
+        description as lists, so neither part needs pickling to be stored.
+        """
+        arrays, layout = [], []
+
+        def add(kind, name, array):
+            if array.dtype == object:
+                layout.append([kind, name, None, list(array)])
+            else:
+                layout.append([kind, name, len(arrays), None])
+                arrays.append(array)
+
+        for name, column in self.columns.items():
+            add('column', name, column)
+        for name, (values, present) in self.parameters.columns.items():
+            add('parameter', name, values)
+            add('present', name, present)
+        for name, column in self.sensor_columns.items():
+            add('sensor', name, column)
+
+        description = {
+            'length': self.length,
+            'layout': layout,
+            'sparse': {name: [[row, value] for row, value in values.items()]
+                       for name, values in self.sparse.items()},
+            'extra_alerts': [[row, alerts] for row, alerts in self.extra_alerts.items()],
+        }
+        return arrays, description
+
+    @classmethod
+    def from_state(cls, arrays, description):
+        """Rebuild a frame from the output of to_state()"""
+        parts = {'column': {}, 'parameter': {}, 'present': {}, 'sensor': {}}
+        for kind, name, index, values in description['layout']:
+            parts[kind][name] = arrays[index] if index is not None else _column_array(values, object)
+        length = description['length']
+        parameters = ParameterStore(length, {name: (values, parts['present'][name])
+                                             for name, values in parts['parameter'].items()})
+        sparse = {name: {int(row): value for row, value in values}
+                  for name, values in description['sparse'].items()}
+        extra_alerts = {int(row): alerts for row, alerts in description['extra_alerts']}
+        return cls(parts['column'], sparse, extra_alerts, length, parameters, parts['sensor'])
+
+
+MAX_SAMPLE_GAP = 300  # seconds a single message may stand for
+SPEEDING_THRESHOLD = 80  # km/h
+
+
+def _message_gaps(t):
+    """Seconds from each message to the next; 0 for the last one and next to missing timestamps"""
+    gaps = np.zeros(len(t))
+    if len(t) > 1:
+        timed = (t[1:] != NO_TIMESTAMP) & (t[:-1] != NO_TIMESTAMP)
+        gaps[:-1] = np.where(timed, np.diff(t), 0)
+    return gaps
+
+
+def _engine_running(frame):
+    """Boolean array of rows with the ignition or the engine reported on"""
+    return (frame['ignition'] != 0) | (frame['engine_on'] != 0)
+
+
+def _state_durations(frame, dt, speed_limit=SPEEDING_THRESHOLD):
+    """Driving, idling, engine-on and speeding seconds given each message's capped duration"""
+    speed = frame['speed']
+    moving = speed > 0
+    engine_on = _engine_running(frame)
+    states = np.vstack([moving, engine_on & ~moving, engine_on, speed > speed_limit])
+    seconds = states @ dt
+    return dict(zip(('driving', 'idling', 'engine_on', 'speeding'), (float(value) for value in seconds)))
+
+
+def integrate_durations(telemetry_data, max_gap=MAX_SAMPLE_GAP, speed_limit=SPEEDING_THRESHOLD):
+    """Seconds spent driving, idling, with the engine on and speeding
+
+    Every message stands for the time until the next one, capped at
+    ``max_gap`` so that outages and parked periods without messages are not
+    counted as time in the last reported state. Driving is any non-zero
+    speed, idling is ignition or engine on while standing still and speeding
+    is speed above ``speed_limit``, as for the speeding violation count.
+    """
+    frame = TelemetryFrame.coerce(telemetry_data)
+    return _state_durations(frame, np.clip(_message_gaps(frame['t']), 0, max_gap), speed_limit)
+
+
+EARTH_RADIUS_KM = 6371.0088
+MIN_SATELLITES = 4
+MAX_HDOP = 5.0
+MAX_PLAUSIBLE_SPEED = 250  # km/h; faster apparent motion is a GPS jump or an odometer glitch
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between coordinates in degrees (scalars or arrays)"""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _path_hops_km(lat, lon):
+    """Haversine length in km of each hop along a track, sharing trigonometry between hops"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    a = np.sin(np.diff(lat) / 2) ** 2 + cos_lat[:-1] * cos_lat[1:] * np.sin(np.diff(lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _gps_hops(frame, min_satellites=MIN_SATELLITES, max_hdop=MAX_HDOP, max_speed=MAX_PLAUSIBLE_SPEED):
+    """Filtered GPS distance in km travelled to reach each row (0 for rows without a counted hop)"""
+    lat, lon = frame['latitude'], frame['longitude']
+    satellites, hdop = frame['satellites'], frame['hdop']
+    distance = np.zeros(len(frame))
+
+    valid = ((lat != 0) | (lon != 0)) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    if satellites.any():
+        valid &= satellites >= min_satellites
+    valid &= (hdop <= max_hdop) | (hdop == 0)  # 0: not reported
+    rows = np.flatnonzero(valid)
+    if len(rows) < 2:
+        return distance
+
+    hops = _path_hops_km(lat[rows], lon[rows])
+    speed = frame['speed'][rows]
+    stationary = (speed[:-1] <= 0) & (speed[1:] <= 0)
+    t = frame['t'][rows]
+    timed = (t[1:] != NO_TIMESTAMP) & (t[:-1] != NO_TIMESTAMP)
+    hours = np.maximum(np.where(timed, np.diff(t), 0), 1) / 3600
+    jump = timed & (hops > max_speed * hours)
+    distance[rows[1:]] = np.where(stationary | jump, 0.0, hops)
+    return distance
+
+
+def gps_path_distance(telemetry_data, min_satellites=MIN_SATELLITES, max_hdop=MAX_HDOP,
+                      max_speed=MAX_PLAUSIBLE_SPEED):
+    """Length in km of a unit's GPS track
+
+    Fixes outside the valid coordinate range or at (0, 0), with fewer than
+    ``min_satellites`` satellites or with an HDOP above ``max_hdop`` are
+    dropped; satellites and HDOP are only checked when the unit reports
+    them. Of the hops between the remaining fixes, those between two fixes
+    at zero speed are stationary jitter and those implying more than
+    ``max_speed`` km/h are GPS jumps, and neither is counted.
+    """
+    frame = TelemetryFrame.coerce(telemetry_data)
+    return float(_gps_hops(frame, min_satellites, max_hdop, max_speed).sum())
+
+
+def _odometer_distance(frame, max_speed=MAX_PLAUSIBLE_SPEED):
+    """Distance in km between the first and last odometer readings, or None if missing or implausible
+
+    A reading going backwards (a reset or swapped device) or covering more
+    than ``max_speed`` km/h over the time between the readings is implausible.
+    """
+    odometer = frame['odometer']
+    readings = np.flatnonzero(odometer > 0)
+    if len(readings) < 2:
+        return None
+    first, last = readings[0], readings[-1]
+    distance = _scalar((odometer[last] - odometer[first]) / 1000)  # Convert to km
+    t_first, t_last = frame['t'][first], frame['t'][last]
+    hours = (t_last - t_first) / 3600 if NO_TIMESTAMP not in (t_first, t_last) else None
+    if distance < 0 or (hours is not None and distance > max_speed * max(hours, 1 / 3600)):
+        return None
+    return distance
+
+
+FUEL_MEDIAN_WINDOW = 9  # samples
+REFUEL_MIN_LITERS = 10.0
+DRAIN_MIN_LITERS = 10.0
+DRAIN_MIN_RATE = 1.0  # L/min; no engine burns fuel this fast
+
+
+class FuelAnalysis:
+    """Refuels, drains and consumption from a unit's fuel level column
+
+    Readings above zero are smoothed with a centred rolling median of
+    ``window`` samples, which removes sloshing spikes but keeps the step of
+    a refuel. A run of consecutive rises adding up to ``refuel_min`` litres
+    or more is a refuel. A run of consecutive drops of ``drain_min`` litres
+    or more is a drain when it is faster than ``drain_rate`` litres per
+    minute or happens while the unit stands still. Consumption is the
+    integral of the remaining drops less the rises too small to be refuels,
+    which are sensor noise.
+    """
+
+    __slots__ = ('consumption', 'refueled', 'drained', 'events')
+
+    def __init__(self, consumption=0.0, refueled=0.0, drained=0.0, events=None):
+        self.consumption = consumption
+        self.refueled = refueled
+        self.drained = drained
+        self.events = events if events is not None else []
+
+    @classmethod
+    def compute(cls, telemetry_data, window=FUEL_MEDIAN_WINDOW, refuel_min=REFUEL_MIN_LITERS,
+                drain_min=DRAIN_MIN_LITERS, drain_rate=DRAIN_MIN_RATE):
+        """Analyse the fuel level of one unit's telemetry"""
+        frame = TelemetryFrame.coerce(telemetry_data)
+        fuel, t = frame['fuel_level'], frame['t']
+        rows = np.flatnonzero((fuel > 0) & (t != NO_TIMESTAMP))
+        if len(rows) < 2:
+            return cls()
+
+        level = pd.Series(fuel[rows]).rolling(window, center=True, min_periods=1).median().to_numpy()
+        t = t[rows]
+        moving = np.concatenate(([0], np.cumsum(frame['speed'][rows] > 0)))
+        change = np.diff(level)
+
+        events = []
+        volumes = {}
+        for kind, sign in (('refuel', 1), ('drain', -1)):
+            steps = np.where(change * sign > 0, change * sign, 0.0)
+            edges = np.diff(np.concatenate(([0], (steps > 0).astype(np.int8), [0])))
+            starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)  # run rows starts..ends
+            total = np.concatenate(([0.0], np.cumsum(steps)))
+            volume = total[ends] - total[starts]
+            if kind == 'refuel':
+                found = volume >= refuel_min
+            else:
+                minutes = (t[ends] - t[starts]) / 60
+                standing = moving[ends + 1] == moving[starts]
+                found = (volume >= drain_min) & (standing | (volume > drain_rate * minutes))
+            volumes[kind] = (float(steps.sum()), float(volume[found].sum()))
+            for start, end, litres in zip(starts[found], ends[found], volume[found]):
+                events.append({
+                    'type': kind,
+                    'start': datetime.fromtimestamp(int(t[start]), timezone.utc),
+                    'end': datetime.fromtimestamp(int(t[end]), timezone.utc),
+                    'volume': float(litres),
+                    'level_before': float(level[start]),
+                    'level_after': float(level[end])
+                })
+        events.sort(key=lambda event: event['start'])
+
+        rises, refueled = volumes['refuel']
+        drops, drained = volumes['drain']
+        consumption = max(0.0, drops - drained - (rises - refueled))
+        return cls(consumption, refueled, drained, events)
+
+
+TRIP_MIN_DURATION = 300  # seconds, as the "duration" of the trips report template
+TRIP_MIN_DISTANCE = 0.1  # km
+TRIP_MIN_STOP = 300  # seconds; shorter stops do not end a trip
+TRIP_MIN_SPEED = 1  # km/h
+
+
+class TripSegmenter:
+    """Splits a unit's telemetry into trips without a server-side report
+
+    A row is in motion when its speed reaches ``min_speed`` and, for units
+    that report them, the ignition (or engine) is on and the movement sensor
+    is active. The state machine goes from parked to driving on the first
+    row in motion and back to parked once the unit has stood still for
+    ``min_stop`` seconds or the ignition is switched off; shorter stops stay
+    inside the trip. Trips shorter than ``min_duration`` seconds or
+    ``min_distance`` km are dropped. Transitions are found with array
+    operations, so the state machine only steps over motion runs, not rows.
+    """
+
+    def __init__(self, min_duration=TRIP_MIN_DURATION, min_distance=TRIP_MIN_DISTANCE,
+                 min_stop=TRIP_MIN_STOP, min_speed=TRIP_MIN_SPEED):
+        self.min_duration = min_duration
+        self.min_distance = min_distance
+        self.min_stop = min_stop
+        self.min_speed = min_speed
+
+    def segment(self, telemetry_data):
+        """Trips as dicts with UTC start/end, duration (s), distance (km), max and average speed"""
+        frame = TelemetryFrame.coerce(telemetry_data)
+        t = frame['t']
+        timed = t != NO_TIMESTAMP
+        if np.count_nonzero(timed) < 2:
+            return []
+        if not timed.all():
+            frame = frame.take(timed)
+            t = frame['t']
+
+        speed = frame['speed']
+        ignition = _engine_running(frame)
+        reports_ignition = bool(ignition.any())
+        movement = frame['movement_sensor'] != 0
+        in_motion = speed >= self.min_speed
+        if reports_ignition:
+            in_motion &= ignition
+        if movement.any():
+            in_motion &= movement
+
+        # Motion runs are rows first..last in motion
+        edges = np.diff(np.concatenate(([0], in_motion.astype(np.int8), [0])))
+        firsts, lasts = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+        if not len(firsts):
+            return []
+
+        # A run continues the previous trip if the stop between them is short and the ignition stays on
+        ignition_off = np.concatenate(([0], np.cumsum(~ignition))) if reports_ignition \
+            else np.zeros(len(frame) + 1, dtype=np.int64)
+        stop_seconds = t[firsts[1:]] - t[lasts[:-1]]
+        switched_off = ignition_off[firsts[1:]] - ignition_off[lasts[:-1] + 1] > 0
+        continues = (stop_seconds < self.min_stop) & ~switched_off
+        trip_of_run = np.concatenate(([0], np.cumsum(~continues)))
+        trip_starts = np.flatnonzero(np.diff(np.concatenate(([-1], trip_of_run))))
+        starts = firsts[trip_starts]
+        ends = np.minimum(lasts[np.concatenate((trip_starts[1:], [len(firsts)])) - 1] + 1, len(frame) - 1)
+
+        gps = np.concatenate(([0.0], np.cumsum(_gps_hops(frame))))
+        distance = gps[ends + 1] - gps[starts + 1]
+        odometer = frame['odometer']
+        odometer_distance = (odometer[ends] - odometer[starts]) / 1000
+        use_odometer = (odometer[starts] > 0) & (odometer[ends] > 0) & (odometer_distance >= 0)
+        distance = np.where(use_odometer, odometer_distance, distance)
+
+        duration = t[ends] - t[starts]
+        keep = (duration >= self.min_duration) & (distance >= self.min_distance)
+        bounds = np.stack([starts, ends + 1], axis=1).ravel()
+        padded_speed = np.append(speed, 0.0)
+        max_speed = np.maximum.reduceat(padded_speed, bounds)[::2]
+
+        lat, lon = frame['latitude'], frame['longitude']
+        trips = []
+        for start, end, km, seconds, top in zip(starts[keep], ends[keep], distance[keep],
+                                                duration[keep], max_speed[keep]):
+            trips.append({
+                'start': datetime.fromtimestamp(int(t[start]), timezone.utc),
+                'end': datetime.fromtimestamp(int(t[end]), timezone.utc),
+                'duration': int(seconds),
+                'distance': float(km),
+                'max_speed': float(top),
+                'avg_speed': float(km / seconds * 3600) if seconds else 0.0,
+                'start_position': (float(lat[start]), float(lon[start])),
+                'end_position': (float(lat[end]), float(lon[end]))
+            })
+        return trips
+
+
+def _first_anomaly(frame):
+    """Description of the first anomalous record's first failing check, as a list"""
+    if not len(frame):
+        return []
+    speed, power_voltage = frame['speed'], frame['power_voltage']
+    checks = [
+        ("Negative speed detected", speed < 0),
+        ("Excessive speed detected (>200 km/h)", speed > 200),
+        ("Invalid GPS coordinates", (abs(frame['latitude']) > 90) | (abs(frame['longitude']) > 180)),
+        ("Low power voltage detected", (power_voltage > 0) & (power_voltage < 9000)),  # Below 9V
+        ("Fuel level >100% detected", frame['fuel_level'] > 100),
+    ]
+    masks = np.vstack([np.asarray(mask, dtype=bool) for _, mask in checks])
+    flagged = masks.any(axis=0)
+    if not flagged.any():
+        return []
+    row = int(np.argmax(flagged))
+    return [checks[int(np.argmax(masks[:, row]))][0]]
+
+
+class SpeedBrackets:
+    """Overspeeding histogram over speed brackets defined by strictly increasing edges (km/h)
+
+    Bracket i covers [edges[i], edges[i + 1]) and the last one is open-ended,
+    so the default edges give 15-35, 35-45, ..., 75-80 and 80+. Speeds below
+    the first edge fall in no bracket. The PTT sheets label each bracket
+    column with its lower edge.
+    """
+
+    DEFAULT_EDGES = (15, 35, 45, 55, 60, 65, 75, 80)
+
+    def __init__(self, edges=DEFAULT_EDGES):
+        edges = list(edges)
+        if not edges:
+            raise ValueError("At least one speed bracket edge is required")
+        if not all(math.isfinite(edge) for edge in edges):
+            raise ValueError(f"Speed bracket edges must be finite numbers, got {edges}")
+        if any(high <= low for low, high in zip(edges, edges[1:])):
+            raise ValueError("Speed bracket edges must be strictly increasing, got "
+                             + ','.join(f'{edge:g}' for edge in edges))
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.labels = [f'{low:g}-{high:g}' for low, high in zip(edges, edges[1:])] + [f'{edges[-1]:g}+']
+        self.headers = [f'{edge:g}' for edge in edges]
+
+    @classmethod
+    def parse(cls, text):
+        """Brackets from a comma-separated list of edges such as '15,35,45,80'
+
+        Raises ValueError for anything that is not a strictly increasing list
+        of numbers.
+        """
+        edges = []
+        for edge in text.split(','):
+            if not edge.strip():
+                continue
+            try:
+                edges.append(float(edge))
+            except ValueError:
+                raise ValueError(f"Invalid speed bracket edge {edge.strip()!r}") from None
+        return cls(edges)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def histogram(self, speed, dt=None):
+        """Message count and, given per-message durations ``dt``, seconds in each bracket"""
+        bins = np.searchsorted(self.edges, speed, side='right') - 1
+        binned = (bins >= 0) & ~np.isnan(speed)
+        counts = np.bincount(bins[binned], minlength=len(self))
+        seconds = np.bincount(bins[binned], weights=dt[binned], minlength=len(self)) \
+            if dt is not None else np.zeros(len(self))
+        return counts, seconds
+
+
+class UnitMetrics:
+    """Every per-unit statistic, computed in one sweep over a TelemetryFrame
+
+    ``summary`` is the comprehensive metrics dict (unit_data['metrics']),
+    ``quality`` the data quality assessment, ``driver`` the driver and
+    vehicle sheet metrics and ``performance`` the traffic light scores.
+    Shared intermediates such as message gaps, speed masks and harsh event
+    totals are computed once for all of them. _assemble_unit_data stores the
+    result as unit_data['unit_metrics'] and the report sheets read it from
+    there.
+    """
+
+    __slots__ = ('summary', 'quality', 'driver', 'performance')
+
+    GAP_THRESHOLD_MINUTES = 10
+
+    def __init__(self, summary, quality, driver, performance):
+        self.summary = summary
+        self.quality = quality
+        self.driver = driver
+        self.performance = performance
+
+    @classmethod
+    def empty(cls):
+        """Metrics of a unit without telemetry"""
+        return cls({}, {'overall_quality': 'Poor', 'issues': ['No data available']}, {},
+                   {'overall_score': 0, 'eco_score': 0, 'safety_score': 0, 'efficiency_score': 0})
+
+    @classmethod
+    def compute(cls, telemetry_data, speed_brackets=None):
+        """Compute all metrics of one unit's telemetry, binning speeds into ``speed_brackets``"""
+        frame = TelemetryFrame.coerce(telemetry_data)
+        total_messages = len(frame)
+        if not total_messages:
+            return cls.empty()
+
+        speed = frame['speed']
+        gaps = _message_gaps(frame['t'])
+        dt = np.clip(gaps, 0, MAX_SAMPLE_GAP)
+        durations = _state_durations(frame, dt)
+
+        # Distance from the odometer, or the GPS track when it is missing or implausible
+        total_distance, distance_source = _odometer_distance(frame), 'odometer'
+        if total_distance is None:
+            total_distance, distance_source = gps_path_distance(frame), 'gps'
+
+        # Speed
+        speeds = speed[speed > 0]
+        max_speed = _scalar(speeds.max()) if len(speeds) else 0
+        avg_speed = _scalar(speeds.sum() / len(speeds)) if len(speeds) else 0
+        speeding_violations = int(np.count_nonzero(speed > SPEEDING_THRESHOLD))
+
+        # Engine
+        engine_on_count = int(np.count_nonzero(_engine_running(frame)))
+        engine_on_percentage = engine_on_count / total_messages * 100
+
+        # Harsh events
+        harsh_acceleration = _scalar(frame['harsh_acceleration'].sum())
+        harsh_braking = _scalar(frame['harsh_braking'].sum())
+        harsh_cornering = _scalar(frame['harsh_cornering'].sum())
+        total_harsh_events = harsh_acceleration + harsh_braking + harsh_cornering
+
+        # Fuel and CO2 (rough estimate: 1L fuel = 2.31 kg CO2)
+        fuel = FuelAnalysis.compute(frame)
+        fuel_consumption = fuel.consumption
+
+        eco_score = frame['eco_driving_score']
+        eco_driving_scores = eco_score[eco_score > 0]
+        avg_eco_score = _scalar(eco_driving_scores.sum() / len(eco_driving_scores)) if len(eco_driving_scores) else 0
+
+        summary = {
+            'totalDistance': total_distance,
+            'distanceSource': distance_source,
+            'maxSpeed': max_speed,
+            'avgSpeed': avg_speed,
+            'drivingHours': durations['driving'] / 3600,
+            'totalEngineHours': durations['engine_on'] / 3600,
+            'totalIdlingTime': durations['idling'] / 3600,
+            'engineOnPercentage': engine_on_percentage,
+            'totalHarshEvents': total_harsh_events,
+            'harshAcceleration': harsh_acceleration,
+            'harshBraking': harsh_braking,
+            'harshCornering': harsh_cornering,
+            'speedingViolations': speeding_violations,
+            'speedingHours': durations['speeding'] / 3600,
+            'fuelConsumption': fuel_consumption,
+            'fuelRefueled': fuel.refueled,
+            'fuelDrained': fuel.drained,
+            'fuelEvents': fuel.events,
+            'co2Emission': fuel_consumption * 2.31,
+            'avgEcoDrivingScore': avg_eco_score,
+            'maintenanceAlerts': frame.unique_alerts(),
+            'dataPoints': total_messages
+        }
+
+        # Data quality
+        issues = []
+        quality_score = 100
+        valid_gps = int(np.count_nonzero((frame['latitude'] != 0) & (frame['longitude'] != 0)))
+        gps_completeness = (valid_gps / total_messages) * 100
+        if gps_completeness < 90:
+            issues.append(f"GPS data only {gps_completeness:.1f}% complete")
+            quality_score -= (100 - gps_completeness) * 0.5
+        speed_completeness = (int(np.count_nonzero(speed >= 0)) / total_messages) * 100
+        if speed_completeness < 95:
+            issues.append(f"Speed data only {speed_completeness:.1f}% complete")
+            quality_score -= (100 - speed_completeness) * 0.3
+        time_gaps = int(np.count_nonzero(gaps > cls.GAP_THRESHOLD_MINUTES * 60))
+        if time_gaps > 0:
+            issues.append(f"{time_gaps} significant time gaps detected")
+            quality_score -= time_gaps * 5
+        anomalies = _first_anomaly(frame)
+        if anomalies:
+            issues.extend(anomalies)
+            quality_score -= len(anomalies) * 10
+        if quality_score >= 90:
+            overall_quality = 'Excellent'
+        elif quality_score >= 75:
+            overall_quality = 'Good'
+        elif quality_score >= 60:
+            overall_quality = 'Fair'
+        else:
+            overall_quality = 'Poor'
+        quality = {
+            'overall_quality': overall_quality,
+            'quality_score': max(0, quality_score),
+            'gps_completeness': gps_completeness,
+            'speed_completeness': speed_completeness,
+            'time_gaps': time_gaps,
+            'issues': issues
+        }
+
+        # Driver and vehicle sheets
+        speed_brackets = speed_brackets or SpeedBrackets()
+        bracket_counts, bracket_seconds = speed_brackets.histogram(speed, dt)
+        driver = {
+            'speed_violations': dict(zip(speed_brackets.labels, map(int, bracket_counts))),
+            'speed_bracket_hours': dict(zip(speed_brackets.labels, (float(s) / 3600 for s in bracket_seconds))),
+            'speeding_duration': durations['speeding'] / 3600,  # Convert to hours
+            'harsh_acceleration': harsh_acceleration,
+            'harsh_braking': harsh_braking,
+            'harsh_turning': harsh_cornering,
+            'total_harsh_events': total_harsh_events
+        }
+
+        performance = cls.scores(summary)
+
+        return cls(summary, quality, driver, performance)
+
+    @staticmethod
+    def scores(summary):
+        """Traffic light scores from a summary dict
+
+        Eco is based on harsh events, safety on speeding and harsh events,
+        and efficiency on idling time.
+        """
+        total_harsh_events = summary['totalHarshEvents']
+        eco = max(0, 100 - (total_harsh_events * 2))
+        safety = max(0, 100 - (summary['speedingViolations'] * 0.5) - (total_harsh_events * 1.5))
+        efficiency = max(0, 100 - (summary['totalIdlingTime'] * 5))
+        return {
+            'overall_score': eco * 0.3 + safety * 0.4 + efficiency * 0.3,
+            'eco_score': eco,
+            'safety_score': safety,
+            'efficiency_score': efficiency
+        }
+
+
+def _chunked(items, size):
+    """Yield lists of up to ``size`` items from any iterable"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_WORKER_PARSERS = {}  # parser key -> UnitMessageParser, per worker process
+WORKER_PARSER_CACHE_SIZE = 64
+
+
+def _parse_batch_shared(parser_key, parser_blob, messages):
+    """Process-pool worker: parse a chunk of messages and return the frame through shared memory
+
+    ``parser_blob`` is the unit's pickled parser. A worker unpickles it the
+    first time it sees ``parser_key`` and reuses it, with its compiled
+    sensors and parameter classification, for every later chunk of the unit.
+    """
+    parser = _WORKER_PARSERS.get(parser_key)
+    if parser is None:
+        if len(_WORKER_PARSERS) >= WORKER_PARSER_CACHE_SIZE:
+            _WORKER_PARSERS.clear()
+        parser = _WORKER_PARSERS[parser_key] = pickle.loads(parser_blob)
+    return parser.parse_batch(messages).to_shared_memory()
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report newly opened connections"""
+
+    def __init__(self, transport, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        transport = self._transport
+        counting_classes = {}
+        for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items():
+            class CountingPool(pool_cls):
+                def _new_conn(self):
+                    transport._count('new_connections')
+                    return super()._new_conn()
+            counting_classes[scheme] = CountingPool
+        self.poolmanager.pool_classes_by_scheme = counting_classes
+
+
+class WialonTransport:
+    """Pooled keep-alive HTTP transport for the Wialon ajax endpoint
+
+    One instance holds a requests.Session for synchronous calls and creates
+    aiohttp sessions with the same limits for the async engine, so TCP/TLS
+    connections to the Wialon host are reused instead of re-established on
+    every call.
+    """
+
+    def __init__(self, base_url="https://hst-api.wialon.com", pool_connections=4,
+                 max_connections=20, max_per_host=10, connect_timeout=10,
+                 read_timeout=30, keepalive_timeout=60):
+        self.base_url = base_url
+        self.url = f"{base_url}/wialon/ajax.html"
+        self.events_url = f"{base_url}/avl_evts"
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = (connect_timeout, read_timeout)
+        self.keepalive_timeout = keepalive_timeout
+
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+
+        self.session = requests.Session()
+        adapter = _CountingHTTPAdapter(self, pool_connections=pool_connections,
+                                       pool_maxsize=max_per_host, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def post(self, data, timeout=None, stream=False, url=None):
+        """POST form data to the ajax endpoint (or ``url``) over a pooled connection"""
+        self._count('requests')
+        return self.session.post(url or self.url, data=data, timeout=timeout or self.timeout,
+                                 stream=stream)
+
+    def create_async_session(self, max_connections=None):
+        """Create an aiohttp ClientSession sharing this transport's limits and counters"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self._count('requests')
+
+        async def on_connection_create_end(session, context, params):
+            self._count('new_connections')
+
+        async def on_connection_reuseconn(session, context, params):
+            self._count('reused_connections')
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        connector = aiohttp.TCPConnector(
+            limit=max_connections or self.max_connections,
+            limit_per_host=self.max_per_host,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=[trace_config])
+
+    def get_stats(self):
+        """Connection counters; reuse for sync calls is derived from new connections"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['reused_connections'] = max(stats['reused_connections'],
+                                          stats['requests'] - stats['new_connections'])
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class WialonSessionManager:
+    """Owns the Wialon session ids (eid) used by every request of a client
+
+    Requests take a session with acquire(). When one reports an invalid
+    session they call renew() with the sid they used: the first caller logs
+    in again and every other caller holding the same stale sid gets the new
+    one, so one expiry costs exactly one token/login however many requests
+    are in flight. ``pool_size`` > 1 keeps several sessions and hands them
+    out round-robin; start_keepalive() pings idle sessions so they do not
+    time out between report runs.
+    """
+
+    def __init__(self, token, transport, pool_size=1):
+        self.token = token
+        self.transport = transport
+        self.pool_size = max(1, pool_size)
+        self.stats = {'logins': 0, 'renewals': 0, 'keepalives': 0}
+
+        self._lock = threading.Lock()
+        self._sessions = []
+        self._replaced = {}
+        self._next = 0
+        self._keepalive_stop = None
+
+    @property
+    def session_id(self):
+        """The primary session id, or None when logged out"""
+        return self._sessions[0] if self._sessions else None
+
+    def _login_one(self):
+        params = {
+            'svc': 'token/login',
+            'params': json.dumps({'token': self.token})
+        }
+        response = self.transport.post(params)
+        result = response.json()
+        if 'error' in result:
+            raise Exception(f"Login failed: {result}")
+        self.stats['logins'] += 1
+        return result
+
+    def login(self):
+        """Open pool_size sessions and return the first login result"""
+        with self._lock:
+            results = [self._login_one() for _ in range(self.pool_size)]
+            self._sessions = [result['eid'] for result in results]
+            self._replaced.clear()
+        return results[0]
+
+    def adopt(self, session_id):
+        """Use a session obtained elsewhere (e.g. an async login) as the only session"""
+        with self._lock:
+            self._sessions = [session_id] if session_id else []
+            self._replaced.clear()
+
+    def acquire(self):
+        """Session id for the next request, rotating through the pool"""
+        with self._lock:
+            if not self._sessions:
+                raise Exception("Not logged in")
+            self._next = (self._next + 1) % len(self._sessions)
+            return self._sessions[self._next]
+
+    def renew(self, stale_session_id):
+        """Replace an expired session once and return the session to retry with"""
+        with self._lock:
+            if stale_session_id in self._replaced:
+                return self._replaced[stale_session_id]
+            if stale_session_id not in self._sessions:
+                if not self._sessions:
+                    raise Exception("Not logged in")
+                return self._sessions[0]
+
+            print("Session expired, re-logging in...")
+            new_session_id = self._login_one()['eid']
+            self._sessions[self._sessions.index(stale_session_id)] = new_session_id
+            self._replaced[stale_session_id] = new_session_id
+            self.stats['renewals'] += 1
+            return new_session_id
+
+    def keepalive(self):
+        """Ping every session so the server does not expire it"""
+        with self._lock:
+            sessions = list(self._sessions)
+        for session_id in sessions:
+            try:
+                self.transport.post({'sid': session_id}, url=self.transport.events_url)
+                self.stats['keepalives'] += 1
+            except requests.RequestException as e:
+                print(f"   ⚠️ Keepalive failed: {e}")
+
+    def start_keepalive(self, interval=240):
+        """Ping sessions from a background thread every ``interval`` seconds"""
+        if self._keepalive_stop is not None:
+            return
+        stop = self._keepalive_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.keepalive()
+
+        threading.Thread(target=run, name="wialon-keepalive", daemon=True).start()
+
+    def stop_keepalive(self):
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
+
+    def logout(self):
+        """Close every session in the pool"""
+        self.stop_keepalive()
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._replaced.clear()
+        for session_id in sessions:
+            self.transport.post({
+                'svc': 'core/logout',
+                'params': '{}',
+                'sid': session_id
+            })
+        return bool(sessions)
+
+
+class _MessagePager:
+    """Cursor for paging messages/load_interval through one interval
+
+    Each page is requested from the timestamp of the previous page's last
+    message; messages already returned for that second are skipped by count,
+    so nothing is lost or repeated at page boundaries.
+    """
+
+    def __init__(self, time_from, time_to, page_size):
+        self.cursor = time_from
+        self.time_to = time_to
+        self.page_size = page_size
+        self.skip = 0
+        self.done = time_from > time_to
+
+    def advance(self, page):
+        """Consume a page and return the messages it adds"""
+        return list(self.consume(page))
+
+    def consume(self, messages):
+        """Yield the new messages of a page given as any iterable, then move the cursor"""
+        count = skipped = trailing = 0
+        last_t = None
+        for msg in messages:
+            count += 1
+            t = msg.get('t')
+            if skipped < self.skip and count == skipped + 1 and t == self.cursor:
+                skipped += 1
+            else:
+                yield msg
+            if t == last_t:
+                trailing += 1
+            else:
+                last_t, trailing = t, 1
+
+        if count < self.page_size:
+            self.done = True
+            return
+
+        if last_t == self.cursor:
+            # A full page inside one second cannot be split further by time
+            print(f"   ⚠️ More than {self.page_size} messages at {last_t}, skipping the rest of that second")
+            self.cursor, self.skip = last_t + 1, 0
+        else:
+            self.cursor, self.skip = last_t, trailing
+
+        if self.cursor > self.time_to:
+            self.done = True
+
+
+class _WindowMerger:
+    """Joins consecutive time windows, dropping messages repeated at window edges"""
+
+    def __init__(self):
+        self.last_t = None
+        self.at_last_t = []
+        self.duplicates = 0
+
+    def merge(self, messages):
+        merged = []
+        for msg in messages:
+            t = msg.get('t', 0)
+            if t == self.last_t:
+                if msg in self.at_last_t:
+                    self.duplicates += 1
+                    continue
+                self.at_last_t.append(msg)
+            else:
+                self.last_t, self.at_last_t = t, [msg]
+            merged.append(msg)
+        return merged
+
+
+def _time_windows(time_from, time_to, window_seconds):
+    """Split [time_from, time_to] into inclusive windows aligned to multiples of window_seconds
+
+    With the default of one day the windows are UTC days.
+    """
+    windows = []
+    start = time_from
+    while start <= time_to:
+        end = min(time_to, (start // window_seconds + 1) * window_seconds - 1)
+        windows.append((start, end))
+        start = end + 1
+    return windows
+
+
+def _prefetched(submit, items, ahead):
+    """Yield ``submit(item).result()`` for each item in order, keeping at most ``ahead`` futures pending
+
+    The next item is only submitted once the oldest result has been taken,
+    so no more than ``ahead`` results are ever held at a time.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(submit(item))
+            if len(pending) >= ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def _prefetched_async(start, items, ahead):
+    """Async counterpart of _prefetched for coroutine functions ``start(item)``"""
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(start(item)))
+            if len(pending) >= ahead:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class MessageNormalizer:
+    """Streaming repair of duplicated and out-of-order raw messages
+
+    Messages pass through a reorder buffer kept sorted by ``t``. A message
+    newer than everything seen so far is appended to the tail, which is all
+    the work done while a stream stays in order; any other one is inserted
+    with a binary search, and dropped if it is an exact duplicate of a
+    message with the same ``t`` still in the buffer or among the ``window``
+    newest released. Once the buffer holds more than ``window`` messages the
+    oldest ones are released, so output stays ordered as long as no message
+    arrives more than ``window`` messages late; such messages are counted in
+    ``stats['late']`` and released out of order, for the caller to fix with
+    TelemetryFrame.sorted_by_time(). ``stats['reordered']`` counts every
+    message older than the newest one pushed before it.
+    """
+
+    def __init__(self, window=4096):
+        self.window = window
+        self.stats = {'messages': 0, 'duplicates': 0, 'reordered': 0, 'late': 0}
+        self._times = []
+        self._buffer = []
+        self._released_times = []  # newest released messages sorted by t, for duplicate checks
+        self._released = []
+        self._last_released = None
+        self._newest = -math.inf  # newest t pushed so far
+
+    @property
+    def repaired(self):
+        """Number of duplicates dropped plus messages that arrived after a newer one"""
+        return self.stats['duplicates'] + self.stats['reordered']
+
+    def normalize(self, messages):
+        """Yield the messages of any iterable in repaired order"""
+        for chunk in _chunked(messages, self.window):
+            yield from self.push(chunk)
+        yield from self.flush()
+
+    def push(self, messages):
+        """Add messages and return the ones that can be released in order"""
+        times, buffer, stats = self._times, self._buffer, self.stats
+        newest, last_released = self._newest, self._last_released
+        for msg in messages:
+            stats['messages'] += 1
+            t = msg.get('t', 0) if isinstance(msg, dict) else 0
+            if t > newest:
+                times.append(t)
+                buffer.append(msg)
+                newest = t
+                continue
+            low = bisect.bisect_left(times, t)
+            high = bisect.bisect_right(times, t, low)
+            if msg in buffer[low:high] or (last_released is not None and t <= last_released
+                                           and self._was_released(t, msg)):
+                stats['duplicates'] += 1
+                continue
+            if t < newest:
+                stats['reordered'] += 1
+            if last_released is not None and t < last_released:
+                stats['late'] += 1
+            times.insert(high, t)
+            buffer.insert(high, msg)
+        self._newest = newest
+        if len(buffer) <= 2 * self.window:
+            return []
+        return self._release(len(buffer) - self.window)
+
+    def flush(self):
+        """Release every buffered message"""
+        return self._release(len(self._buffer))
+
+    def _was_released(self, t, msg):
+        low = bisect.bisect_left(self._released_times, t)
+        high = bisect.bisect_right(self._released_times, t, low)
+        return msg in self._released[low:high]
+
+    def _release(self, count):
+        released, released_times = self._buffer[:count], self._times[:count]
+        del self._buffer[:count]
+        del self._times[:count]
+        if not released:
+            return released
+        if self._released_times and released_times[0] < self._released_times[-1]:
+            pairs = sorted(zip(self._released_times + released_times, self._released + released),
+                           key=lambda pair: pair[0])
+            self._released_times = [t for t, _ in pairs]
+            self._released = [msg for _, msg in pairs]
+        else:
+            self._released_times += released_times
+            self._released += released
+        excess = len(self._released) - self.window
+        if excess > 0:
+            del self._released_times[:excess]
+            del self._released[:excess]
+        if self._last_released is None or released_times[-1] > self._last_released:
+            self._last_released = released_times[-1]
+        return released
+
+
+class RawMessageCache:
+    """Persistent cache of raw messages/load_interval results per unit and UTC day
+
+    Each (unit_id, day) is one gzip file holding a JSON header line followed
+    by the JSON message array. The header carries the message count and a
+    SHA-256 of the payload, which are checked on every read; unreadable or
+    mismatching files are deleted and treated as missing. A day is stored as
+    complete once it ended more than ``settle_seconds`` before it was
+    fetched, and only complete days are served from the cache. When the
+    cache grows past ``max_bytes`` the least recently used files are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, settle_seconds=3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.settle_seconds = settle_seconds
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'corrupt': 0}
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._files())
+
+    def _path(self, unit_id, day_start):
+        day = datetime.fromtimestamp(day_start, timezone.utc).strftime('%Y-%m-%d')
+        return os.path.join(self.directory, str(unit_id), f"{day}.json.gz")
+
+    def _files(self):
+        """(path, size, mtime) of every cached file"""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.json.gz'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, unit_id, day_start):
+        """Messages of a complete cached day, or None if missing, incomplete or corrupt"""
+        path = self._path(unit_id, day_start)
+        try:
+            with gzip.open(path, 'rb') as f:
+                header_line, payload = f.read().split(b'\n', 1)
+            header = json.loads(header_line)
+            if hashlib.sha256(payload).hexdigest() != header['sha256']:
+                raise ValueError("checksum mismatch")
+            messages = json.loads(payload)
+            if len(messages) != header['count']:
+                raise ValueError("message count mismatch")
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except (OSError, EOFError, zlib.error, ValueError, KeyError) as e:
+            print(f"   ⚠️ Discarding corrupt cache file {path}: {e}")
+            self.stats['corrupt'] += 1
+            self._remove(path)
+            return None
+
+        if not header.get('complete'):
+            self.stats['misses'] += 1
+            return None
+
+        os.utime(path)  # Mark as recently used for eviction
+        self.stats['hits'] += 1
+        return messages
+
+    def put(self, unit_id, day_start, messages, fetched_at):
+        """Store a full day of messages fetched at ``fetched_at``"""
+        complete = day_start + 86400 <= fetched_at - self.settle_seconds
+        payload = json.dumps(messages, separators=(',', ':')).encode()
+        header = {
+            'unit_id': unit_id,
+            'day_start': day_start,
+            'complete': complete,
+            'count': len(messages),
+            'sha256': hashlib.sha256(payload).hexdigest(),
+            'fetched_at': fetched_at
+        }
+
+        path = self._path(unit_id, day_start)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            f.write(payload)
+
+        with self._lock:
+            try:
+                self._total_bytes -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self._total_bytes += os.path.getsize(path)
+            self.stats['stores'] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits max_bytes (lock held)"""
+        for path, size, _ in sorted(self._files(), key=lambda f: f[2]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.stats['evictions'] += 1
+
+
+class WatermarkStore:
+    """Per-unit timestamp of the last ingested message, optionally persisted as JSON
+
+    With a ``path``, each unit's incremental state (telemetry, remote trips,
+    events and the interval already fetched) is kept in the ``<path>.state``
+    directory, so a new process can resume from the watermarks instead of
+    re-extracting everything. Each unit is one compressed ``.npz`` holding
+    the telemetry arrays and a JSON description of the rest, tagged with
+    STATE_VERSION; state of another version is discarded, which makes the
+    unit start over with a full extraction.
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.watermarks = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.watermarks = {int(unit_id): t for unit_id, t in json.load(f).items()}
+
+    def get(self, unit_id):
+        return self.watermarks.get(unit_id)
+
+    def update(self, unit_id, timestamp):
+        if timestamp > self.watermarks.get(unit_id, -1):
+            self.watermarks[unit_id] = timestamp
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({str(unit_id): t for unit_id, t in self.watermarks.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def _state_path(self, unit_id):
+        return os.path.join(f"{self.path}.state", f"{unit_id}.npz")
+
+    def load_state(self, unit_id):
+        """A unit's stored incremental state without its unit data, or None"""
+        path = self._state_path(unit_id) if self.path else None
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                description = json.loads(stored['state'].tobytes().decode('utf-8'))
+                if description.get('version') != self.STATE_VERSION:
+                    print(f"   ⚠️ Discarding incremental state of unit {unit_id} "
+                          f"(version {description.get('version')}, expected {self.STATE_VERSION})")
+                    os.remove(path)
+                    return None
+                frame = description['telemetry_data']
+                arrays = [stored[f'a{index}'] for index in range(frame['arrays'])]
+        except Exception as e:
+            print(f"   ⚠️ Ignoring unreadable incremental state of unit {unit_id}: {e}")
+            return None
+        return {
+            'telemetry_data': TelemetryFrame.from_state(arrays, frame['description']),
+            'trips_data': description['trips_data'],
+            'events_data': description['events_data'],
+            'watermark': description['watermark'],
+            'watermark_messages': description['watermark_messages'],
+            'fetched_to': description['fetched_to']
+        }
+
+    def save_state(self, unit_id, state):
+        """Store a unit's incremental state (its unit data is rebuilt on loading)"""
+        if not self.path:
+            return
+        arrays, frame_description = state['telemetry_data'].to_state()
+        description = {
+            'version': self.STATE_VERSION,
+            'telemetry_data': {'arrays': len(arrays), 'description': frame_description},
+            'trips_data': state['trips_data'],
+            'events_data': state['events_data'],
+            'watermark': state['watermark'],
+            'watermark_messages': state['watermark_messages'],
+            'fetched_to': state['fetched_to']
+        }
+        encoded = json.dumps(description, default=_json_default).encode('utf-8')
+        path = self._state_path(unit_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, state=np.frombuffer(encoded, dtype=np.uint8),
+                                **{f'a{index}': array for index, array in enumerate(arrays)})
+        os.replace(tmp_path, path)
+
+
+def _json_default(value):
+    """JSON encoding of the NumPy scalars and arrays that end up in stored state"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_loads(data):
+    """Decode a JSON document with orjson when installed, else the standard library"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class _ChunkReader:
+    """File-like view over an iterator of byte chunks that remembers the first bytes read"""
+
+    def __init__(self, chunks, head_size=4096):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._head_size = head_size
+        self.head = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        if len(self.head) < self._head_size:
+            self.head += data[:self._head_size - len(self.head)]
+        return data
+
+
+def _iter_json_array_items_ijson(chunks, key, top_level):
+    reader = _ChunkReader(chunks)
+    found = False
+    try:
+        for item in ijson.items(reader, f"{key}.item", use_float=True):
+            found = True
+            yield item
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON response: {e}")
+
+    # Without items the response may be an error object; it is small enough to be in the head
+    if not found:
+        try:
+            head = json.loads(reader.head)
+        except ValueError:
+            head = None
+        if isinstance(head, dict):
+            top_level.update((name, value) for name, value in head.items() if name != key)
+
+
+def _iter_json_array_items_stdlib(chunks, key, top_level):
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buf, pos = buf[pos:] + utf8.decode(b'', final=True), 0
+            return False
+        buf, pos = buf[pos:] + utf8.decode(chunk), 0
+        return True
+
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ''
+
+    def expect(chars):
+        nonlocal pos
+        char = peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid JSON response: expected one of {chars!r}, got {char!r}")
+        pos += 1
+        return char
+
+    def decode_value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A value ending exactly at the buffer end may be a truncated number
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            pos = end
+            return value
+
+    expect('{')
+    if peek() == '}':
+        return
+    while True:
+        name = decode_value()
+        expect(':')
+        if name == key and peek() == '[':
+            pos += 1
+            if peek() == ']':
+                pos += 1
+            else:
+                while True:
+                    yield decode_value()
+                    if expect(',]') == ']':
+                        break
+        else:
+            top_level[name] = decode_value()
+        if expect(',}') == '}':
+            return
+
+
+def iter_json_array_items(chunks, key='messages', top_level=None):
+    """Yield the items of the top-level ``key`` array of a JSON object read from byte chunks
+
+    Items are decoded one at a time as the bytes arrive, using ijson when it
+    is installed and an incremental standard-library decoder otherwise.
+    Other top-level members (e.g. ``error``) are stored in ``top_level``.
+    """
+    if top_level is None:
+        top_level = {}
+    if ijson is not None:
+        return _iter_json_array_items_ijson(chunks, key, top_level)
+    return _iter_json_array_items_stdlib(chunks, key, top_level)
+
+
+# Decoded messages handed on together when streaming a load_interval response
+STREAM_BATCH_SIZE = 1000
+
+# Messages requested per messages/load_interval call
+MESSAGE_PAGE_SIZE = 10000
+
+# Default shard length for per-window message fetches
+MESSAGE_WINDOW_SECONDS = 86400
+
+EVENT_TYPES = [
+    'maintenance',
+    'speeding',
+    'geofence',
+    'driver_change',
+    'fuel_theft',
+    'panic_button'
+]
+
 class EnhancedWialonExtractor:
-    def __init__(self, token, base_url="https://hst-api.wialon.com"):
+    def __init__(self, token, base_url="https://hst-api.wialon.com", transport=None,
+                 session_pool_size=1, message_cache=None, watermarks=None, stream_decode=False,
+                 speed_brackets=None, remote_trips=False, trip_segmenter=None):
         self.base_url = base_url
-        self.session_id = None
+        self.transport = transport or WialonTransport(base_url)
+        self.sessions = WialonSessionManager(token, self.transport, pool_size=session_pool_size)
+        self.message_cache = message_cache
+        self.watermarks = watermarks or WatermarkStore()
+        self._incremental_state = {}
+        self.stream_decode = stream_decode
+        self.speed_brackets = speed_brackets or SpeedBrackets()
+        self.remote_trips = remote_trips
+        self.trip_segmenter = trip_segmenter or TripSegmenter()
+        self._frame_metrics = weakref.WeakKeyDictionary()  # TelemetryFrame -> UnitMetrics
         self.token = token
         self.unit_sensors = {}
+        self._message_parsers = {}
+        self.hw_types = {}
         self.unit_info = {}
         self.drivers_info = {}
         self.geofences = {}
+        self._request_semaphore = None
+        self._parse_pool = None
+        self._parse_pool_size = 0
+        self.message_repairs = {}
+
+    @contextmanager
+    def parse_processes(self, processes):
+        """Parse message chunks in a pool of ``processes`` worker processes inside the block
+
+        ``processes=0`` starts one worker per CPU core and ``None`` keeps
+        parsing in this process. Parsed columns come back from the workers
+        through shared memory (see TelemetryFrame.to_shared_memory).
+        """
+        if processes is None or self._parse_pool is not None:
+            yield
+            return
+        size = processes or os.cpu_count() or 1
+        print(f"🧮 Parsing in {size} worker processes")
+        # spawn: the keep-alive thread and open connections must not be forked
+        self._parse_pool = ProcessPoolExecutor(size, mp_context=multiprocessing.get_context('spawn'))
+        self._parse_pool_size = size
+        try:
+            yield
+        finally:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+            self._parse_pool_size = 0
+
+    @property
+    def session_id(self):
+        return self.sessions.session_id
+
+    @session_id.setter
+    def session_id(self, value):
+        self.sessions.adopt(value)
+
+    async def login(self, session=None):
+        """Async login using token, optionally on an existing ClientSession"""
+        if self.sessions.pool_size > 1:
+            return await asyncio.to_thread(self.login_sync)
 
-    async def login(self):
-        """Async login using token"""
-        url = f"{self.base_url}/wialon/ajax.html"
         params = {
             'svc': 'token/login',
             'params': json.dumps({'token': self.token})
         }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=params) as response:
-                result = await response.json()
-                if 'error' in result:
-                    raise Exception(f"Login failed: {result}")
-                self.session_id = result['eid']
-                print(f"✅ Logged in. Session ID: {self.session_id}")
-                return result
+
+        if session is None:
+            async with self.transport.create_async_session() as own_session:
+                return await self.login(own_session)
+
+        async with session.post(self.transport.url, data=params) as response:
+            result = await response.json(content_type=None)
+            if 'error' in result:
+                raise Exception(f"Login failed: {result}")
+            self.sessions.adopt(result['eid'])
+            print(f"✅ Logged in. Session ID: {self.session_id}")
+            return result
 
     def login_sync(self):
         """Synchronous login for compatibility"""
-        url = f"{self.base_url}/wialon/ajax.html"
-        params = {
-            'svc': 'token/login',
-            'params': json.dumps({'token': self.token})
-        }
-        response = requests.post(url, data=params)
-        result = response.json()
-        if 'error' in result:
-            raise Exception(f"Login failed: {result}")
-        self.session_id = result['eid']
+        result = self.sessions.login()
         print(f"✅ Logged in. Session ID: {self.session_id}")
+        if self.sessions.pool_size > 1:
+            print(f"   🔑 Session pool: {self.sessions.pool_size} sessions")
         return result
 
     def logout(self):
         """Logout"""
-        if self.session_id:
-            url = f"{self.base_url}/wialon/ajax.html"
-            params = {
-                'svc': 'core/logout',
-                'params': '{}',
-                'sid': self.session_id
-            }
-            requests.post(url, data=params)
+        if self.sessions.logout():
             print("✅ Logged out")
-            self.session_id = None
 
     def make_request(self, service, params={}):
         """Make API request with enhanced error handling"""
         if not self.session_id:
             raise Exception("Not logged in")
             
-        url = f"{self.base_url}/wialon/ajax.html"
         data = {
             'svc': service,
             'params': json.dumps(params),
-            'sid': self.session_id
+            'sid': self.sessions.acquire()
         }
         
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = requests.post(url, data=data, timeout=30)
-                result = response.json()
+                response = self.transport.post(data)
+                result = _json_loads(response.content)
                 
                 if 'error' in result:
                     if result['error'] == 1:  # Invalid session
-                        print("Session expired, re-logging in...")
-                        self.login_sync()
-                        data['sid'] = self.session_id
+                        data['sid'] = self.sessions.renew(data['sid'])
                         continue
                     else:
                         raise Exception(f"API Error in {service}: {result}")
@@ -168,9 +2950,168 @@ class EnhancedWialonExtractor:
                 if attempt == max_retries - 1:
                     raise Exception(f"Request failed after {max_retries} attempts: {e}")
                 time.sleep(2 ** attempt)  # Exponential backoff
-                
+
+        return None
+
+    def make_request_stream(self, service, params={}, key='messages'):
+        """Make an API request and yield the items of the response's ``key`` array as they are decoded
+
+        The response body is never buffered whole. Retries and session renewal
+        only happen before the first item has been yielded.
+        """
+        if not self.session_id:
+            raise Exception("Not logged in")
+
+        data = {
+            'svc': service,
+            'params': json.dumps(params),
+            'sid': self.sessions.acquire()
+        }
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            yielded = False
+            try:
+                top_level = {}
+                with self.transport.post(data, stream=True) as response:
+                    for item in iter_json_array_items(response.iter_content(chunk_size=65536), key, top_level):
+                        yielded = True
+                        yield item
+
+                if top_level.get('error'):
+                    if top_level['error'] == 1:  # Invalid session
+                        data['sid'] = self.sessions.renew(data['sid'])
+                        continue
+                    else:
+                        raise Exception(f"API Error in {service}: {top_level}")
+
+                return
+
+            except (requests.RequestException, ValueError) as e:
+                if yielded or attempt == max_retries - 1:
+                    raise Exception(f"Streaming request failed after {attempt + 1} attempts: {e}")
+                time.sleep(2 ** attempt)  # Exponential backoff
+
+    async def make_request_async(self, session, service, params={}):
+        """Async counterpart of make_request on a shared aiohttp ClientSession"""
+        if not self.session_id:
+            raise Exception("Not logged in")
+
+        if self._request_semaphore is None:
+            self._init_async_limits(10)
+
+        data = {
+            'svc': service,
+            'params': json.dumps(params),
+            'sid': self.sessions.acquire()
+        }
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                async with self._request_semaphore:
+                    async with session.post(self.transport.url, data=data) as response:
+                        result = await response.json(content_type=None)
+
+                if 'error' in result:
+                    if result['error'] == 1:  # Invalid session
+                        data['sid'] = await asyncio.to_thread(self.sessions.renew, data['sid'])
+                        continue
+                    else:
+                        raise Exception(f"API Error in {service}: {result}")
+
+                return result
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+                if attempt == max_retries - 1:
+                    raise Exception(f"Request failed after {max_retries} attempts: {e}")
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+
         return None
 
+    def _init_async_limits(self, concurrency):
+        """Create the asyncio primitives for the current event loop"""
+        self._request_semaphore = asyncio.Semaphore(concurrency)
+
+    def make_batch_request(self, calls, chunk_size=50):
+        """Send independent (service, params) calls packed into core/batch requests
+
+        Calls are split into chunks of at most ``chunk_size``. The returned list
+        is aligned with ``calls``; each entry is the call's result, or the
+        Exception it failed with after being retried on its own.
+        """
+        results = [None] * len(calls)
+        failed = []
+
+        for start in range(0, len(calls), chunk_size):
+            chunk = calls[start:start + chunk_size]
+            try:
+                batch_result = self.make_request('core/batch', self._batch_params(chunk))
+            except Exception as e:
+                print(f"   ⚠️ Batch of {len(chunk)} calls failed, retrying individually: {e}")
+                failed.extend(range(start, start + len(chunk)))
+                continue
+
+            for offset, sub_result in enumerate(self._split_batch_result(chunk, batch_result)):
+                if isinstance(sub_result, Exception):
+                    failed.append(start + offset)
+                else:
+                    results[start + offset] = sub_result
+
+        for idx in failed:
+            service, params = calls[idx]
+            try:
+                results[idx] = self.make_request(service, params)
+            except Exception as e:
+                results[idx] = e
+
+        return results
+
+    async def make_batch_request_async(self, session, calls, chunk_size=50):
+        """Async variant of make_batch_request; chunks are sent concurrently"""
+        async def send_chunk(chunk):
+            try:
+                batch_result = await self.make_request_async(session, 'core/batch', self._batch_params(chunk))
+                sub_results = self._split_batch_result(chunk, batch_result)
+            except Exception as e:
+                print(f"   ⚠️ Batch of {len(chunk)} calls failed, retrying individually: {e}")
+                sub_results = [e] * len(chunk)
+
+            async def retry(call, sub_result):
+                if not isinstance(sub_result, Exception):
+                    return sub_result
+                try:
+                    return await self.make_request_async(session, *call)
+                except Exception as e:
+                    return e
+
+            return await asyncio.gather(*(retry(call, r) for call, r in zip(chunk, sub_results)))
+
+        chunks = [calls[start:start + chunk_size] for start in range(0, len(calls), chunk_size)]
+        chunk_results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+        return [result for chunk_result in chunk_results for result in chunk_result]
+
+    def _batch_params(self, calls):
+        """Build core/batch parameters for a list of (service, params) calls"""
+        return {
+            "params": [{"svc": service, "params": params} for service, params in calls],
+            "flags": 0
+        }
+
+    def _split_batch_result(self, calls, batch_result):
+        """Map a core/batch response back onto its calls, turning sub-errors into exceptions"""
+        if not isinstance(batch_result, list) or len(batch_result) != len(calls):
+            error = Exception(f"Unexpected core/batch response: {str(batch_result)[:200]}")
+            return [error] * len(calls)
+
+        sub_results = []
+        for (service, _), sub_result in zip(calls, batch_result):
+            if isinstance(sub_result, dict) and sub_result.get('error'):
+                sub_results.append(Exception(f"API Error in {service}: {sub_result}"))
+            else:
+                sub_results.append(sub_result)
+        return sub_results
+
     def get_all_units(self):
         """Get all units with comprehensive flags"""
         print("📋 Getting all units...")
@@ -211,6 +3152,11 @@ class EnhancedWialonExtractor:
                     'equipment': unit.get('eqp', {})
                 }
                 self.unit_sensors[unit['id']] = unit.get('sens', {})
+                self._message_parsers.pop(unit['id'], None)
+            
+            # Hardware type names select each unit's device profile
+            if units and not self.hw_types:
+                self.get_hardware_types()
             
             return units
             
@@ -254,21 +3200,349 @@ class EnhancedWialonExtractor:
             print(f"   ❌ Error getting drivers: {e}")
             return []
 
+    def get_hardware_types(self):
+        """Get Wialon hardware type names by id"""
+        print("🔧 Getting hardware types...")
+        try:
+            hw_params = {
+                "filterType": "",
+                "filterValue": [],
+                "includeType": True,
+                "ignoreRename": True
+            }
+            
+            result = self.make_request('core/get_hw_types', hw_params)
+            hw_types = result if isinstance(result, list) else []
+            
+            for hw_type in hw_types:
+                self.hw_types[hw_type.get('id')] = hw_type.get('name', '')
+            
+            profiled = sum(1 for unit_id in self.unit_info if self.get_device_profile(unit_id))
+            print(f"   ✅ Found {len(hw_types)} hardware types ({profiled} units with a device profile)")
+            return hw_types
+            
+        except Exception as e:
+            print(f"   ❌ Error getting hardware types: {e}")
+            return []
+
+    def _messages_params(self, unit_id, time_from, time_to, load_count=MESSAGE_PAGE_SIZE):
+        """Build messages/load_interval parameters"""
+        return {
+            "itemId": unit_id,
+            "timeFrom": time_from,
+            "timeTo": time_to,
+            "flags": 0,
+            "flagsMask": 65535,  # All flags
+            "loadCount": load_count
+        }
+
+    def _trips_params(self, unit_id, time_from, time_to):
+        """Build report/exec_report parameters for the inline trips template"""
+        return {
+            "reportResourceId": unit_id,
+            "reportTemplateId": 1,
+            "reportTemplate": {
+                "n": "trips_report",
+                "ct": "avl_unit",
+                "p": {
+                    "grouping": json.dumps({"type": "day"}),
+                    "trips": json.dumps({"type": "all"}),
+                    "duration": TRIP_MIN_DURATION,  # Minimum trip duration in seconds
+                    "filter": json.dumps({"type": "all"})
+                }
+            },
+            "interval": {
+                "from": time_from,
+                "to": time_to,
+                "flags": 0
+            }
+        }
+
+    def _events_params(self, unit_id, time_from, time_to):
+        """Build avl_evts parameters"""
+        return {
+            "itemId": unit_id,
+            "timeFrom": time_from,
+            "timeTo": time_to,
+            "flags": 0,
+            "flagsMask": 65535,
+            "loadCount": 1000
+        }
+
+    def _messages_from_result(self, result):
+        return result.get('messages', [])
+
+    def _trips_from_result(self, result):
+        if result and 'reportResult' in result:
+            return result['reportResult'].get('tables', [])
+        return []
+
+    def _messages_in_batch(self):
+        """Whether the first messages page is requested as part of a unit's core/batch call
+
+        With a message cache messages are loaded per day, and with streaming
+        decode a batched page would be buffered whole inside the batch
+        response, so in both cases _stream_messages fetches them itself.
+        """
+        return self.message_cache is None and not self.stream_decode
+
+    def _unit_calls(self, unit_id, time_from, time_to, window_seconds=None):
+        """All per-unit calls as (service, params): messages, trips, then one per event type
+
+        With ``window_seconds`` the messages call covers only the first window.
+        The trips report is only requested with ``remote_trips``.
+        """
+        events_params = self._events_params(unit_id, time_from, time_to)
+        calls = [('report/exec_report', self._trips_params(unit_id, time_from, time_to))] \
+            if self.remote_trips else []
+        calls += [('avl_evts', events_params) for _ in EVENT_TYPES]
+
+        if self._messages_in_batch():
+            messages_to = _time_windows(time_from, time_to, window_seconds)[0][1] \
+                if window_seconds and time_from <= time_to else time_to
+            calls.insert(0, ('messages/load_interval',
+                             self._messages_params(unit_id, time_from, messages_to)))
+        return calls
+
+    def _unit_payloads(self, unit_id, results):
+        """Split results of _unit_calls into the first messages page, trips and events data
+
+        The messages entry is the raw load_interval result for use as
+        ``first_result`` of iter_message_batches, or None if it failed or was
+        not part of the batch. Trips data is None when trips are segmented
+        locally.
+        """
+        messages_result = None
+        if self._messages_in_batch():
+            messages_result, results = results[0], results[1:]
+            if isinstance(messages_result, Exception):
+                print(f"   ❌ Error getting messages for unit {unit_id}: {messages_result}")
+                messages_result = None
+        if not self.remote_trips:
+            trips_data, events_results = None, results
+        elif isinstance(results[0], Exception):
+            print(f"   ❌ Error getting trips for unit {unit_id}: {results[0]}")
+            trips_data, events_results = [], results[1:]
+        else:
+            trips_data, events_results = self._trips_from_result(results[0]), results[1:]
+
+        events_data = {}
+        for event_type, result in zip(EVENT_TYPES, events_results):
+            if isinstance(result, Exception):
+                print(f"   ⚠️ Error getting {event_type} events for unit {unit_id}: {result}")
+                events_data[event_type] = []
+            else:
+                events_data[event_type] = result.get('events', [])
+
+        return messages_result, trips_data, events_data
+
+    def iter_message_batches(self, unit_id, time_from, time_to, page_size=MESSAGE_PAGE_SIZE,
+                             first_result=None):
+        """Yield all messages of a unit in [time_from, time_to] page by page
+
+        Pages hold at most ``page_size`` messages, so the interval is never
+        truncated and only one page of raw JSON is held at a time.
+        ``first_result`` is an already fetched load_interval result for the
+        first page (e.g. from a core/batch call).
+        """
+        pager = _MessagePager(time_from, time_to, page_size)
+        while not pager.done:
+            if first_result is not None:
+                result, first_result = first_result, None
+            elif self.stream_decode:
+                yield from self._iter_streamed_page(unit_id, pager)
+                continue
+            else:
+                params = self._messages_params(unit_id, pager.cursor, time_to, page_size)
+                result = self.make_request('messages/load_interval', params)
+            page = pager.advance(self._messages_from_result(result))
+            if page:
+                yield page
+
+    def _iter_streamed_page(self, unit_id, pager):
+        """Load one page with streaming decode, yielding small batches as messages are decoded"""
+        params = self._messages_params(unit_id, pager.cursor, pager.time_to, pager.page_size)
+        batch = []
+        for msg in pager.consume(self.make_request_stream('messages/load_interval', params)):
+            batch.append(msg)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def iter_message_batches_async(self, session, unit_id, time_from, time_to,
+                                         page_size=MESSAGE_PAGE_SIZE, first_result=None):
+        """Async variant of iter_message_batches"""
+        pager = _MessagePager(time_from, time_to, page_size)
+        while not pager.done:
+            if first_result is not None:
+                result, first_result = first_result, None
+            else:
+                params = self._messages_params(unit_id, pager.cursor, time_to, page_size)
+                result = await self.make_request_async(session, 'messages/load_interval', params)
+            page = pager.advance(self._messages_from_result(result))
+            if page:
+                yield page
+
+    def get_messages_sharded(self, unit_id, time_from, time_to, window_seconds=MESSAGE_WINDOW_SECONDS,
+                             max_workers=4):
+        """Fetch a unit's messages as parallel per-window requests merged in timestamp order"""
+        print(f"📡 Extracting enhanced messages for unit {unit_id} in {window_seconds}s windows...")
+        try:
+            messages = list(self._stream_messages(unit_id, time_from, time_to,
+                                                  window_seconds=window_seconds, max_workers=max_workers))
+            print(f"   ✅ Found {len(messages)} messages")
+            return messages
+
+        except Exception as e:
+            print(f"   ❌ Error getting messages: {e}")
+            return []
+
+    def _collect_window(self, unit_id, time_from, time_to, first_result=None):
+        """All messages of one window as a list"""
+        messages = []
+        for batch in self.iter_message_batches(unit_id, time_from, time_to, first_result=first_result):
+            messages.extend(batch)
+        return messages
+
+    def _stream_messages(self, unit_id, time_from, time_to, first_result=None, window_seconds=None,
+                         max_workers=4):
+        """Messages of a unit as one flat, ordered stream
+
+        Without ``window_seconds`` pages are fetched one after another. With it,
+        the interval is split into windows fetched by ``max_workers`` threads and
+        yielded back in window order; a window is only requested once an older
+        one has been yielded, so at most ``max_workers`` are held in memory.
+        ``first_result`` is the first page of the first window.
+        """
+        if self.message_cache is not None:
+            yield from self._stream_cached_messages(unit_id, time_from, time_to, max_workers)
+            return
+
+        windows = _time_windows(time_from, time_to, window_seconds) if window_seconds else []
+        if len(windows) <= 1:
+            for batch in self.iter_message_batches(unit_id, time_from, time_to, first_result=first_result):
+                yield from batch
+            return
+
+        merger = _WindowMerger()
+        firsts = [first_result] + [None] * (len(windows) - 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            window_messages = _prefetched(lambda args: pool.submit(self._collect_window, unit_id, *args),
+                                          [(start, end, first) for (start, end), first in zip(windows, firsts)],
+                                          max_workers)
+            for messages in window_messages:
+                yield from merger.merge(messages)
+
+    def _load_day(self, unit_id, day_start):
+        """Fetch one full UTC day and store it in the message cache"""
+        fetched_at = time.time()
+        messages = self._collect_window(unit_id, day_start, day_start + 86399)
+        self.message_cache.put(unit_id, day_start, messages, fetched_at)
+        return messages
+
+    def _cached_day(self, unit_id, day_start, fetched):
+        """One day's messages from the cache, fetched (and noted in ``fetched``) if missing"""
+        messages = self.message_cache.get(unit_id, day_start)
+        if messages is None:
+            fetched.append(day_start)
+            messages = self._load_day(unit_id, day_start)
+        return messages
+
+    def _stream_cached_messages(self, unit_id, time_from, time_to, max_workers=4):
+        """Ordered message stream served from the cache, fetching missing days in parallel
+
+        Days are read or fetched by ``max_workers`` threads at most
+        ``max_workers`` days ahead of the consumer, so only those are held in
+        memory.
+        """
+        days = [start - start % 86400 for start, _ in _time_windows(time_from, time_to, 86400)]
+        fetched = []
+
+        merger = _WindowMerger()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            day_messages = _prefetched(lambda day: pool.submit(self._cached_day, unit_id, day, fetched),
+                                       days, max_workers)
+            for day, messages in zip(days, day_messages):
+                if day < time_from or day + 86399 > time_to:
+                    messages = [m for m in messages if time_from <= m.get('t', 0) <= time_to]
+                yield from merger.merge(messages)
+        if fetched:
+            print(f"   💾 {len(days) - len(fetched)}/{len(days)} days cached, fetched {len(fetched)}")
+
+    async def _load_day_async(self, session, unit_id, day_start):
+        """Async variant of _load_day"""
+        fetched_at = time.time()
+        messages = []
+        async for batch in self.iter_message_batches_async(session, unit_id, day_start, day_start + 86399):
+            messages.extend(batch)
+        self.message_cache.put(unit_id, day_start, messages, fetched_at)
+        return messages
+
+    async def _iter_cached_batches_async(self, session, unit_id, time_from, time_to, max_workers=4):
+        """Async counterpart of _stream_cached_messages, yielding one batch per day
+
+        Each cached day is read only when its turn comes; missing days are
+        fetched at most ``max_workers`` days ahead of the consumer.
+        """
+        days = [start - start % 86400 for start, _ in _time_windows(time_from, time_to, 86400)]
+
+        async def load(day):
+            messages = self.message_cache.get(unit_id, day)
+            if messages is None:
+                messages = await self._load_day_async(session, unit_id, day)
+            return messages
+
+        merger = _WindowMerger()
+        day_messages = _prefetched_async(load, days, max_workers)
+        day_iter = iter(days)
+        async for messages in day_messages:
+            day = next(day_iter)
+            if day < time_from or day + 86399 > time_to:
+                messages = [m for m in messages if time_from <= m.get('t', 0) <= time_to]
+            yield merger.merge(messages)
+
+    async def _iter_window_batches_async(self, session, unit_id, time_from, time_to, first_result=None,
+                                         window_seconds=None, max_workers=4):
+        """Async counterpart of _stream_messages, yielding one batch per page or window
+
+        At most ``max_workers`` windows are requested ahead of the consumer.
+        """
+        if self.message_cache is not None:
+            async for batch in self._iter_cached_batches_async(session, unit_id, time_from, time_to,
+                                                               max_workers):
+                yield batch
+            return
+
+        windows = _time_windows(time_from, time_to, window_seconds) if window_seconds else []
+        if len(windows) <= 1:
+            async for batch in self.iter_message_batches_async(session, unit_id, time_from, time_to,
+                                                               first_result=first_result):
+                yield batch
+            return
+
+        async def collect(start, end, first):
+            messages = []
+            async for batch in self.iter_message_batches_async(session, unit_id, start, end,
+                                                               first_result=first):
+                messages.extend(batch)
+            return messages
+
+        merger = _WindowMerger()
+        firsts = [first_result] + [None] * (len(windows) - 1)
+        async for messages in _prefetched_async(lambda args: collect(*args),
+                                                [(start, end, first) for (start, end), first in zip(windows, firsts)],
+                                                max_workers):
+            yield merger.merge(messages)
+
     def get_enhanced_messages(self, unit_id, time_from, time_to):
         """Get enhanced messages with all available data"""
         print(f"📡 Extracting enhanced messages for unit {unit_id}...")
         try:
-            messages_params = {
-                "itemId": unit_id,
-                "timeFrom": time_from,
-                "timeTo": time_to,
-                "flags": 0,
-                "flagsMask": 65535,  # All flags
-                "loadCount": 10000   # Increased load count
-            }
-            
-            result = self.make_request('messages/load_interval', messages_params)
-            messages = result.get('messages', [])
+            messages = []
+            for batch in self.iter_message_batches(unit_id, time_from, time_to):
+                messages.extend(batch)
             
             print(f"   ✅ Found {len(messages)} messages")
             return messages
@@ -282,35 +3556,16 @@ class EnhancedWialonExtractor:
         print(f"🚗 Getting trips data for unit {unit_id}...")
         try:
             # Use report template for trips
-            report_params = {
-                "reportResourceId": unit_id,
-                "reportTemplateId": 1,
-                "reportTemplate": {
-                    "n": "trips_report",
-                    "ct": "avl_unit",
-                    "p": {
-                        "grouping": json.dumps({"type": "day"}),
-                        "trips": json.dumps({"type": "all"}),
-                        "duration": 300,  # Minimum trip duration in seconds
-                        "filter": json.dumps({"type": "all"})
-                    }
-                },
-                "interval": {
-                    "from": time_from,
-                    "to": time_to,
-                    "flags": 0
-                }
-            }
+            report_params = self._trips_params(unit_id, time_from, time_to)
             
             result = self.make_request('report/exec_report', report_params)
+            trips = self._trips_from_result(result)
             
-            if result and 'reportResult' in result:
-                trips = result['reportResult'].get('tables', [])
+            if trips:
                 print(f"   ✅ Found {len(trips)} trip records")
-                return trips
             else:
                 print("   ⚠️ No trips data available")
-                return []
+            return trips
                 
         except Exception as e:
             print(f"   ❌ Error getting trips: {e}")
@@ -321,25 +3576,9 @@ class EnhancedWialonExtractor:
         print(f"⚡ Getting events data for unit {unit_id}...")
         events_data = {}
         
-        event_types = [
-            'maintenance',
-            'speeding',
-            'geofence',
-            'driver_change',
-            'fuel_theft',
-            'panic_button'
-        ]
-        
-        for event_type in event_types:
+        for event_type in EVENT_TYPES:
             try:
-                events_params = {
-                    "itemId": unit_id,
-                    "timeFrom": time_from,
-                    "timeTo": time_to,
-                    "flags": 0,
-                    "flagsMask": 65535,
-                    "loadCount": 1000
-                }
+                events_params = self._events_params(unit_id, time_from, time_to)
                 
                 result = self.make_request('avl_evts', events_params)
                 events_data[event_type] = result.get('events', [])
@@ -350,174 +3589,67 @@ class EnhancedWialonExtractor:
         
         return events_data
 
-    def parse_enhanced_message(self, msg, unit_id) -> EnhancedTelemetryData:
-        """Parse a single message with enhanced data extraction"""
-        telemetry = EnhancedTelemetryData()
-        
-        if not msg or not isinstance(msg, dict):
-            return telemetry
-            
-        # Basic message data
-        telemetry.timestamp = datetime.fromtimestamp(msg.get('t', 0))
-        
-        # Position data
-        pos = msg.get('pos', {})
-        if pos:
-            telemetry.latitude = pos.get('y', 0.0)
-            telemetry.longitude = pos.get('x', 0.0)
-            telemetry.altitude = pos.get('z', 0.0)
-            telemetry.speed = pos.get('s', 0.0)
-            telemetry.course = pos.get('c', 0.0)
-            telemetry.satellites = pos.get('sc', 0)
-            telemetry.hdop = pos.get('hdop', 0.0)
-        
-        # Parameters
-        params = msg.get('p', {})
-        telemetry.raw_parameters = params.copy()
-        
-        # Enhanced parameter mapping with more comprehensive coverage
-        parameter_mapping = {
-            # Power and electrical
-            'pwr_ext': 'power_voltage',
-            'pwr_int': 'battery_voltage',
-            'battery': 'battery_voltage',
-            'int_battery': 'internal_battery',
-            'gsm_signal': 'gsm_signal',
-            'gsm_level': 'gsm_signal',
-            'pcb_temp': 'temperature',
-            'temperature': 'temperature',
-            'temp1': 'temperature',
-            
-            # Engine and vehicle - expanded
-            'engine_on': 'engine_on',
-            'ignition': 'ignition',
-            'ign': 'ignition',
-            'acc': 'ignition',
-            'mileage': 'odometer',
-            'odometer': 'odometer',
-            'engine_hours': 'engine_hours',
-            'eh': 'engine_hours',
-            'fuel_level': 'fuel_level',
-            'fuel_lvl': 'fuel_level',
-            'fuel1': 'fuel_level',
-            'fuel_consumption': 'fuel_consumption',
-            'fuel_cons': 'fuel_consumption',
-            'rpm': 'rpm',
-            'engine_rpm': 'rpm',
-            'coolant_temp': 'coolant_temp',
-            'engine_temp': 'coolant_temp',
-            'oil_pressure': 'oil_pressure',
-            'oil_press': 'oil_pressure',
-            
-            # Movement and behavior - expanded
-            'acceleration': 'acceleration',
-            'acc_x': 'acceleration',
-            'max_acceleration': 'max_acceleration',
-            'max_acc': 'max_acceleration',
-            'max_braking': 'max_braking',
-            'max_brake': 'max_braking',
-            'harsh_acceleration': 'harsh_acceleration',
-            'harsh_acc': 'harsh_acceleration',
-            'harsh_braking': 'harsh_braking',
-            'harsh_brake': 'harsh_braking',
-            'harsh_cornering': 'harsh_cornering',
-            'harsh_turn': 'harsh_cornering',
-            'wln_crn_max': 'max_cornering',
-            'cornering': 'max_cornering',
-            'idling_time': 'idling_time',
-            'idle_time': 'idling_time',
-            'movement_sens': 'movement_sensor',
-            'movement': 'movement_sensor',
-            
-            # Driver and trip
-            'avl_driver': 'driver_id',
-            'driver_code': 'driver_id',
-            'driver_id': 'driver_id',
-            'trip_id': 'trip_id',
-            'trip': 'trip_id',
-            
-            # Additional vehicle parameters
-            'door_1': 'digital_inputs',
-            'door_2': 'digital_inputs',
-            'panic': 'digital_inputs',
-            'sos': 'digital_inputs',
-            'tilt': 'analog_inputs',
-            'vibration': 'analog_inputs',
-            'ext_temp': 'analog_inputs',
-            'humidity': 'analog_inputs',
-        }
-        
-        # Apply enhanced parameter mapping
-        for param_key, param_value in params.items():
-            if param_key in parameter_mapping:
-                attr_name = parameter_mapping[param_key]
-                if attr_name in ['engine_on', 'ignition']:
-                    setattr(telemetry, attr_name, bool(param_value))
-                elif attr_name not in ['digital_inputs', 'analog_inputs']:
-                    setattr(telemetry, attr_name, param_value)
-        
-        # Enhanced digital inputs parsing
-        for key, value in params.items():
-            if key.startswith('din') and key[3:].isdigit():
-                telemetry.digital_inputs[key] = bool(value)
-            elif key.startswith('door'):
-                telemetry.digital_inputs[key] = bool(value)
-            elif key in ['panic', 'sos', 'alarm']:
-                telemetry.digital_inputs[key] = bool(value)
-        
-        # Enhanced digital outputs parsing
-        for key, value in params.items():
-            if key.startswith('dout') and key[4:].isdigit():
-                telemetry.digital_outputs[key] = bool(value)
-            elif key.startswith('relay'):
-                telemetry.digital_outputs[key] = bool(value)
-        
-        # Enhanced analog inputs parsing
-        for key, value in params.items():
-            if key.startswith('ain') and key[3:].isdigit():
-                telemetry.analog_inputs[key] = float(value)
-            elif key in ['tilt', 'vibration', 'ext_temp', 'humidity', 'pressure']:
-                telemetry.analog_inputs[key] = float(value)
-        
-        # Enhanced CAN bus data parsing
-        can_keys = [k for k in params.keys() if k.startswith('can_') or k.startswith('j1939_')]
-        for key in can_keys:
-            telemetry.can_data[key] = params[key]
-        
-        # Custom sensors - enhanced mapping
-        if unit_id in self.unit_sensors:
-            for sensor_id, sensor_info in self.unit_sensors[unit_id].items():
-                sensor_name = sensor_info.get('n', f'sensor_{sensor_id}')
-                param_name = sensor_info.get('p', '')
-                if param_name and param_name in params:
-                    telemetry.custom_sensors[sensor_name] = params[param_name]
-        
-        # Calculate derived metrics
-        telemetry.speeding_violations = 1 if telemetry.speed > 80 else 0  # Configurable threshold
-        
-        # Calculate eco-driving score (simplified)
-        eco_score = 100
-        if telemetry.harsh_acceleration > 0:
-            eco_score -= (telemetry.harsh_acceleration * 5)
-        if telemetry.harsh_braking > 0:
-            eco_score -= (telemetry.harsh_braking * 5)
-        if telemetry.harsh_cornering > 0:
-            eco_score -= (telemetry.harsh_cornering * 3)
-        if telemetry.speed > 100:
-            eco_score -= 10
-        telemetry.eco_driving_score = max(0, eco_score)
-        
-        # Check for maintenance alerts
-        if telemetry.engine_hours > 0 and telemetry.engine_hours % 100 < 1:  # Every 100 hours
-            telemetry.maintenance_alerts.append("Engine maintenance due")
-        if telemetry.odometer > 0 and telemetry.odometer % 10000 < 100:  # Every 10000 km
-            telemetry.maintenance_alerts.append("Vehicle service due")
-        if telemetry.fuel_level < 10:
-            telemetry.maintenance_alerts.append("Low fuel level")
-        if telemetry.power_voltage < 11000:  # Below 11V
-            telemetry.maintenance_alerts.append("Low battery voltage")
-        
-        return telemetry
+    async def get_enhanced_messages_async(self, session, unit_id, time_from, time_to):
+        """Async variant of get_enhanced_messages"""
+        try:
+            messages = []
+            async for batch in self.iter_message_batches_async(session, unit_id, time_from, time_to):
+                messages.extend(batch)
+            return messages
+
+        except Exception as e:
+            print(f"   ❌ Error getting messages for unit {unit_id}: {e}")
+            return []
+
+    async def get_trips_data_async(self, session, unit_id, time_from, time_to):
+        """Async variant of get_trips_data"""
+        try:
+            report_params = self._trips_params(unit_id, time_from, time_to)
+            result = await self.make_request_async(session, 'report/exec_report', report_params)
+            return self._trips_from_result(result)
+
+        except Exception as e:
+            print(f"   ❌ Error getting trips for unit {unit_id}: {e}")
+            return []
+
+    async def get_events_data_async(self, session, unit_id, time_from, time_to):
+        """Async variant of get_events_data, fetching all event types concurrently"""
+        events_params = self._events_params(unit_id, time_from, time_to)
+        results = await asyncio.gather(
+            *(self.make_request_async(session, 'avl_evts', events_params) for _ in EVENT_TYPES),
+            return_exceptions=True
+        )
+
+        events_data = {}
+        for event_type, result in zip(EVENT_TYPES, results):
+            if isinstance(result, Exception):
+                print(f"   ⚠️ Error getting {event_type} events for unit {unit_id}: {result}")
+                events_data[event_type] = []
+            else:
+                events_data[event_type] = result.get('events', [])
+
+        return events_data
+
+    def get_device_profile(self, unit_id) -> Optional[DeviceProfile]:
+        """Device profile for a unit's hardware type (None means the generic mapping)"""
+        hw = self.unit_info.get(unit_id, {}).get('device_type', '')
+        return device_profile_for(self.hw_types.get(hw, hw if isinstance(hw, str) else ''))
+
+    def get_message_parser(self, unit_id) -> UnitMessageParser:
+        """Return the unit's compiled message parser, compiling it on first use"""
+        parser = self._message_parsers.get(unit_id)
+        if parser is None:
+            parser = self._message_parsers[unit_id] = UnitMessageParser(self.unit_sensors.get(unit_id),
+                                                                        self.get_device_profile(unit_id))
+        return parser
+
+    def parse_enhanced_message(self, msg, unit_id) -> CompactTelemetryData:
+        """Parse a single message with enhanced data extraction"""
+        return self.get_message_parser(unit_id).parse(msg)
+
+    def parse_messages_batch(self, messages, unit_id) -> TelemetryFrame:
+        """Parse a list of messages into a TelemetryFrame without building per-message records"""
+        return self.get_message_parser(unit_id).parse_batch(messages)
 
     def generate_ptt_excel_report(self, units_data, date_range, report_type="weekly"):
         """Generate Excel report matching PTT template exactly"""
@@ -569,7 +3701,7 @@ class EnhancedWialonExtractor:
         # Create Driver Performance sheet
         self._create_driver_performance_sheet(workbook, units_data, date_range, 
                                             title_format, header_format, data_format, 
-                                            number_format, time_format)
+                                            number_format, time_format, report_type)
         
         # Create Vehicle Performance sheet
         self._create_vehicle_performance_sheet(workbook, units_data, date_range,
@@ -586,18 +3718,35 @@ class EnhancedWialonExtractor:
 
     def _create_driver_performance_sheet(self, workbook, units_data, date_range,
                                        title_format, header_format, data_format,
-                                       number_format, time_format):
+                                       number_format, time_format, report_type="weekly"):
         """Create driver performance sheet matching PTT template"""
         
         sheet = workbook.add_worksheet("Driver Performance")
+        brackets = self.speed_brackets
+        
+        # Headers row 10-11, one overspeeding column per speed bracket
+        headers_row1 = [
+            "DRIVER'S ASSIGNMENT", "DRIVER'S NAME", "Raw", "Raw", "Raw", "Raw",
+            "TOTAL DISTANCE(KM)", "", "TOTAL DRIVING HOURS", "", "Idling", "",
+            "ENGINE HOURS", "", "", "SPEEDING DURATION", "OVERSPEEDING VIOLATION",
+            *[""] * len(brackets), "HARSH\nACCELERATION", "HARSH\nBRAKING",
+            "HARSH\nTURNING", "TOTAL", "Date", "Action Taken", "Signature"
+        ]
+        
+        headers_row2 = [
+            "", "", "Mileage", "Driving Hours", "Idling Duration", "Engine Hours",
+            "", "", "", "", "Duration", "", "", "", "", "", *brackets.headers,
+            "Total", "", "", "", "", "", "", ""
+        ]
+        last_column = xl_col_to_name(len(headers_row1) - 1)
         
         # Set column widths
         sheet.set_column('A:A', 20)  # Driver Assignment
         sheet.set_column('B:B', 30)  # Driver Name
-        sheet.set_column('C:AF', 12)  # Data columns
+        sheet.set_column(f'C:{last_column}', 12)  # Data columns
         
         # Title
-        sheet.merge_range('B1:AF1', "Driver's Performance Summary", title_format)
+        sheet.merge_range(f'B1:{last_column}1', "Driver's Performance Summary", title_format)
         
         # Week/Period info
         sheet.merge_range('I4:L4', f"Week {report_type.capitalize()}", header_format)
@@ -608,21 +3757,6 @@ class EnhancedWialonExtractor:
         sheet.write('U6', 'DATE TO:', header_format)
         sheet.write('U7', date_range['to'], data_format)
         
-        # Headers row 10-11
-        headers_row1 = [
-            "DRIVER'S ASSIGNMENT", "DRIVER'S NAME", "Raw", "Raw", "Raw", "Raw",
-            "TOTAL DISTANCE(KM)", "", "TOTAL DRIVING HOURS", "", "Idling", "",
-            "ENGINE HOURS", "", "", "SPEEDING DURATION", "OVERSPEEDING VIOLATION",
-            "", "", "", "", "", "", "", "", "HARSH\nACCELERATION", "HARSH\nBRAKING",
-            "HARSH\nTURNING", "TOTAL", "Date", "Action Taken", "Signature"
-        ]
-        
-        headers_row2 = [
-            "", "", "Mileage", "Driving Hours", "Idling Duration", "Engine Hours",
-            "", "", "", "", "Duration", "", "", "", "", "", "15", "35", "45", "55",
-            "60", "65", "75", "80", "Total", "", "", "", "", "", "", ""
-        ]
-        
         # Write headers
         for col, header in enumerate(headers_row1):
             sheet.write(9, col, header, header_format)
@@ -638,10 +3772,9 @@ class EnhancedWialonExtractor:
                 continue
                 
             metrics = unit_data.get('metrics', {})
-            telemetry_data = unit_data.get('telemetry_data', [])
             
-            # Calculate driver-specific metrics
-            driver_metrics = self._calculate_driver_metrics(telemetry_data)
+            # Driver-specific metrics
+            driver_metrics = self._unit_metrics(unit_data).driver
             
             # Write row data
             row_data = [
@@ -660,16 +3793,8 @@ class EnhancedWialonExtractor:
                 metrics.get('totalEngineHours', 0) / 24 if metrics.get('totalEngineHours', 0) > 0 else 0,  # Engine hours
                 0, 0,  # Extra columns
                 driver_metrics.get('speeding_duration', 0),  # Speeding duration
-                # Speed violation brackets
-                driver_metrics.get('speed_violations', {}).get('15-35', 0),
-                driver_metrics.get('speed_violations', {}).get('35-45', 0),
-                driver_metrics.get('speed_violations', {}).get('45-55', 0),
-                driver_metrics.get('speed_violations', {}).get('55-60', 0),
-                driver_metrics.get('speed_violations', {}).get('60-65', 0),
-                driver_metrics.get('speed_violations', {}).get('65-75', 0),
-                driver_metrics.get('speed_violations', {}).get('75-80', 0),
-                driver_metrics.get('speed_violations', {}).get('80+', 0),
-                sum(driver_metrics.get('speed_violations', {}).values()),  # Total violations
+                # Speed violation brackets and their total
+                *self._speed_violation_cells(driver_metrics),
                 driver_metrics.get('harsh_acceleration', 0),
                 driver_metrics.get('harsh_braking', 0),
                 driver_metrics.get('harsh_turning', 0),
@@ -693,38 +3818,40 @@ class EnhancedWialonExtractor:
         """Create vehicle performance sheet matching PTT template"""
         
         sheet = workbook.add_worksheet("Vehicle Performance")
+        brackets = self.speed_brackets
         
-        # Set column widths
-        sheet.set_column('A:A', 15)  # Department
-        sheet.set_column('B:B', 10)  # Type
-        sheet.set_column('C:C', 15)  # Vehicle No
-        sheet.set_column('D:AH', 12)  # Data columns
-        
-        # Title
-        sheet.merge_range('C1:AH1', "Vehicle Performance Summary", title_format)
-        
-        # Date range
-        sheet.write('J5', 'DATE FROM:', header_format)
-        sheet.write('J6', date_range['from'], data_format)
-        sheet.write('V5', 'DATE TO:', header_format)
-        sheet.write('V6', date_range['to'], data_format)
-        
-        # Headers
+        # Headers, one overspeeding column per speed bracket
         headers_row1 = [
             "Department", "", "Vehicle No.", "Raw", "Raw", "Raw", "Raw",
             "TOTAL DISTANCE(KM)", "", "TOTAL DRIVING HOURS", "", "Idling", "",
             "ENGINE HOURS", "", "", "SPEEDING DURATION", "OVERSPEEDING VIOLATION",
-            "", "", "", "", "", "", "", "", "HARSH\nACCELERATION", "HARSH\nBRAKING",
+            *[""] * len(brackets), "HARSH\nACCELERATION", "HARSH\nBRAKING",
             "HARSH\nTURNING", "TOTAL", "FUEL CONSUMPTION (LITRE)", "", "",
             "TOTAL CO2 EMISSION (KG)"
         ]
         
         headers_row2 = [
             "", "", "", "Mileage", "Driving Hours", "Idling Duration", "Engine Hours",
-            "", "", "", "", "Duration", "", "", "", "", "", "15", "35", "45", "55",
-            "60", "65", "75", "80", "Total", "", "", "", "", "DRIVING HOURS",
+            "", "", "", "", "Duration", "", "", "", "", "", *brackets.headers,
+            "Total", "", "", "", "", "DRIVING HOURS",
             "IDLING DURATION", "ENGINE HOURS", ""
         ]
+        last_column = xl_col_to_name(len(headers_row1) - 1)
+        
+        # Set column widths
+        sheet.set_column('A:A', 15)  # Department
+        sheet.set_column('B:B', 10)  # Type
+        sheet.set_column('C:C', 15)  # Vehicle No
+        sheet.set_column(f'D:{last_column}', 12)  # Data columns
+        
+        # Title
+        sheet.merge_range(f'C1:{last_column}1', "Vehicle Performance Summary", title_format)
+        
+        # Date range
+        sheet.write('J5', 'DATE FROM:', header_format)
+        sheet.write('J6', date_range['from'], data_format)
+        sheet.write('V5', 'DATE TO:', header_format)
+        sheet.write('V6', date_range['to'], data_format)
         
         # Write headers
         for col, header in enumerate(headers_row1):
@@ -741,10 +3868,9 @@ class EnhancedWialonExtractor:
                 continue
                 
             metrics = unit_data.get('metrics', {})
-            telemetry_data = unit_data.get('telemetry_data', [])
             
-            # Calculate vehicle-specific metrics
-            vehicle_metrics = self._calculate_vehicle_metrics(telemetry_data)
+            # Vehicle-specific metrics (same as driver for this template)
+            vehicle_metrics = self._unit_metrics(unit_data).driver
             
             # Write row data
             row_data = [
@@ -764,16 +3890,8 @@ class EnhancedWialonExtractor:
                 metrics.get('totalEngineHours', 0) / 24 if metrics.get('totalEngineHours', 0) > 0 else 0,  # Engine hours
                 0, 0,  # Extra columns
                 vehicle_metrics.get('speeding_duration', 0),  # Speeding duration
-                # Speed violation brackets
-                vehicle_metrics.get('speed_violations', {}).get('15-35', 0),
-                vehicle_metrics.get('speed_violations', {}).get('35-45', 0),
-                vehicle_metrics.get('speed_violations', {}).get('45-55', 0),
-                vehicle_metrics.get('speed_violations', {}).get('55-60', 0),
-                vehicle_metrics.get('speed_violations', {}).get('60-65', 0),
-                vehicle_metrics.get('speed_violations', {}).get('65-75', 0),
-                vehicle_metrics.get('speed_violations', {}).get('75-80', 0),
-                vehicle_metrics.get('speed_violations', {}).get('80+', 0),
-                sum(vehicle_metrics.get('speed_violations', {}).values()),  # Total violations
+                # Speed violation brackets and their total
+                *self._speed_violation_cells(vehicle_metrics),
                 vehicle_metrics.get('harsh_acceleration', 0),
                 vehicle_metrics.get('harsh_braking', 0),
                 vehicle_metrics.get('harsh_turning', 0),
@@ -792,6 +3910,11 @@ class EnhancedWialonExtractor:
             
             row += 1
 
+    def _speed_violation_cells(self, sheet_metrics):
+        """Per-bracket overspeeding counts in header order, followed by their total"""
+        violations = sheet_metrics.get('speed_violations', {})
+        return [violations.get(label, 0) for label in self.speed_brackets.labels] + [sum(violations.values())]
+
     def _create_traffic_light_performance_sheet(self, workbook, units_data,
                                               title_format, header_format, data_format):
         """Create traffic light performance index sheet"""
@@ -819,11 +3942,8 @@ class EnhancedWialonExtractor:
             if unit_data.get('error'):
                 continue
                 
-            metrics = unit_data.get('metrics', {})
-            telemetry_data = unit_data.get('telemetry_data', [])
-            
-            # Calculate performance scores
-            performance = self._calculate_performance_scores(telemetry_data, metrics)
+            # Performance scores
+            performance = self._unit_metrics(unit_data).performance
             
             # Determine traffic light color
             overall_score = performance['overall_score']
@@ -861,49 +3981,7 @@ class EnhancedWialonExtractor:
 
     def _calculate_driver_metrics(self, telemetry_data):
         """Calculate driver-specific metrics"""
-        if not telemetry_data:
-            return {}
-        
-        # Speed violations by brackets
-        speed_violations = {
-            '15-35': 0, '35-45': 0, '45-55': 0, '55-60': 0,
-            '60-65': 0, '65-75': 0, '75-80': 0, '80+': 0
-        }
-        
-        harsh_acceleration = sum(d.harsh_acceleration for d in telemetry_data)
-        harsh_braking = sum(d.harsh_braking for d in telemetry_data)
-        harsh_turning = sum(d.harsh_cornering for d in telemetry_data)
-        
-        speeding_duration = 0
-        
-        for data in telemetry_data:
-            speed = data.speed
-            if 15 <= speed < 35:
-                speed_violations['15-35'] += 1
-            elif 35 <= speed < 45:
-                speed_violations['35-45'] += 1
-            elif 45 <= speed < 55:
-                speed_violations['45-55'] += 1
-            elif 55 <= speed < 60:
-                speed_violations['55-60'] += 1
-            elif 60 <= speed < 65:
-                speed_violations['60-65'] += 1
-            elif 65 <= speed < 75:
-                speed_violations['65-75'] += 1
-            elif 75 <= speed < 80:
-                speed_violations['75-80'] += 1
-            elif speed >= 80:
-                speed_violations['80+'] += 1
-                speeding_duration += 1  # Count as speeding time
-        
-        return {
-            'speed_violations': speed_violations,
-            'speeding_duration': speeding_duration * 5 / 3600,  # Convert to hours
-            'harsh_acceleration': harsh_acceleration,
-            'harsh_braking': harsh_braking,
-            'harsh_turning': harsh_turning,
-            'total_harsh_events': harsh_acceleration + harsh_braking + harsh_turning
-        }
+        return self._metrics_of(telemetry_data).driver
 
     def _calculate_vehicle_metrics(self, telemetry_data):
         """Calculate vehicle-specific metrics (same as driver for this template)"""
@@ -911,46 +3989,56 @@ class EnhancedWialonExtractor:
 
     def _calculate_performance_scores(self, telemetry_data, metrics):
         """Calculate performance scores for traffic light system"""
-        if not telemetry_data:
-            return {
-                'overall_score': 0, 'eco_score': 0, 
-                'safety_score': 0, 'efficiency_score': 0
-            }
-        
-        # Eco driving score (based on harsh events and speeding)
-        total_harsh = sum(d.harsh_acceleration + d.harsh_braking + d.harsh_cornering 
-                         for d in telemetry_data)
-        eco_score = max(0, 100 - (total_harsh * 2))
-        
-        # Safety score (based on speeding violations and harsh events)
-        speeding_count = sum(1 for d in telemetry_data if d.speed > 80)
-        safety_score = max(0, 100 - (speeding_count * 0.5) - (total_harsh * 1.5))
-        
-        # Efficiency score (based on idling time and fuel consumption)
-        total_idling = sum(d.idling_time for d in telemetry_data)
-        idling_hours = total_idling / 3600
-        efficiency_score = max(0, 100 - (idling_hours * 5))
-        
-        # Overall score (weighted average)
-        overall_score = (eco_score * 0.3 + safety_score * 0.4 + efficiency_score * 0.3)
-        
-        return {
-            'overall_score': overall_score,
-            'eco_score': eco_score,
-            'safety_score': safety_score,
-            'efficiency_score': efficiency_score
-        }
+        if metrics and all(key in metrics for key in ('totalHarshEvents', 'speedingViolations',
+                                                      'totalIdlingTime')):
+            return UnitMetrics.scores(metrics)
+        return self._metrics_of(telemetry_data).performance
 
-    def extract_comprehensive_fleet_data(self, date_range, report_type="weekly"):
-        """Extract comprehensive fleet data for all units"""
-        print(f"\n🚀 COMPREHENSIVE FLEET DATA EXTRACTION")
-        print(f"📅 Date Range: {date_range['from']} to {date_range['to']}")
-        print(f"📊 Report Type: {report_type}")
-        print("=" * 80)
+    def _unit_metrics(self, unit_data):
+        """The unit's UnitMetrics, computed if the unit data predates them"""
+        unit_metrics = unit_data.get('unit_metrics')
+        if unit_metrics is None:
+            unit_metrics = self._metrics_of(unit_data.get('telemetry_data'))
+        return unit_metrics
+
+    def _metrics_of(self, telemetry_data):
+        """UnitMetrics of a telemetry frame, reusing the ones computed when its unit was assembled"""
+        if not isinstance(telemetry_data, TelemetryFrame):
+            return UnitMetrics.compute(telemetry_data, self.speed_brackets)
+        unit_metrics = self._frame_metrics.get(telemetry_data)
+        if unit_metrics is None:
+            unit_metrics = self._frame_metrics[telemetry_data] = UnitMetrics.compute(telemetry_data,
+                                                                                     self.speed_brackets)
+        return unit_metrics
+
+    def extract_comprehensive_fleet_data(self, date_range, report_type="weekly", concurrency=None,
+                                         batch_size=50, window_seconds=None, processes=None):
+        """Extract comprehensive fleet data for all units
+
+        Units are processed one after another unless ``concurrency`` is given,
+        in which case the asyncio engine is used with at most ``concurrency``
+        requests in flight. Per-unit calls are packed into core/batch requests
+        of up to ``batch_size`` calls; pass ``batch_size=None`` to send them
+        one by one. ``window_seconds`` splits each unit's message fetch into
+        windows loaded in parallel. ``processes`` parses the messages of the
+        sequential engine in that many worker processes (0: one per core)
+        while the next pages are fetched.
+        """
+        if concurrency:
+            return asyncio.run(
+                self.extract_comprehensive_fleet_data_async(date_range, report_type, concurrency,
+                                                            batch_size, window_seconds)
+            )
+
+        with self.parse_processes(processes):
+            return self._extract_units_sequential(date_range, report_type, batch_size, window_seconds)
+
+    def _extract_units_sequential(self, date_range, report_type, batch_size, window_seconds):
+        """Sequential engine of extract_comprehensive_fleet_data"""
+        self._print_extraction_header(date_range, report_type)
         
         # Calculate time range
-        time_from = int(datetime.strptime(date_range['from'], "%Y-%m-%d").timestamp())
-        time_to = int(datetime.strptime(date_range['to'], "%Y-%m-%d").timestamp())
+        time_from, time_to = self._time_range(date_range)
         
         # Get all units
         units = self.get_all_units()
@@ -961,6 +4049,10 @@ class EnhancedWialonExtractor:
         # Get drivers information
         self.get_drivers()
         
+        if batch_size:
+            units_data = self._extract_units_batched(units, time_from, time_to, batch_size, window_seconds)
+            return self._finalize_fleet_data(units, units_data, date_range, report_type)
+
         # Extract data for each unit
         units_data = []
         total_units = len(units)
@@ -973,59 +4065,372 @@ class EnhancedWialonExtractor:
             print("-" * 60)
             
             try:
-                # Get enhanced messages
-                messages = self.get_enhanced_messages(unit_id, time_from, time_to)
+                # Stream messages page by page into the parser
+                print(f"📡 Extracting enhanced messages for unit {unit_id}...")
+                messages = self._stream_messages(unit_id, time_from, time_to,
+                                                 window_seconds=window_seconds)
                 
-                # Parse all messages
-                telemetry_data = []
-                for msg in messages:
-                    parsed_msg = self.parse_enhanced_message(msg, unit_id)
-                    telemetry_data.append(parsed_msg)
-                
-                print(f"   ✅ Parsed {len(telemetry_data)} telemetry records")
-                
-                # Get trips data
-                trips_data = self.get_trips_data(unit_id, time_from, time_to)
+                # Get trips data (segmented locally from the telemetry unless remote_trips)
+                trips_data = self.get_trips_data(unit_id, time_from, time_to) if self.remote_trips else None
                 
                 # Get events data
                 events_data = self.get_events_data(unit_id, time_from, time_to)
                 
-                # Calculate comprehensive metrics
-                metrics = self.calculate_comprehensive_metrics(telemetry_data)
-                
-                # Store unit data
-                unit_data = {
-                    'id': unit_id,
-                    'name': unit_name,
-                    'device_info': self.unit_info.get(unit_id, {}),
-                    'telemetry_data': telemetry_data,
-                    'trips_data': trips_data,
-                    'events_data': events_data,
-                    'metrics': metrics,
-                    'last_message': telemetry_data[-1] if telemetry_data else {},
-                    'data_quality': self.assess_data_quality(telemetry_data)
-                }
-                
-                units_data.append(unit_data)
-                
-                # Print unit summary
-                print(f"   📊 Distance: {metrics.get('totalDistance', 0):.2f} km")
-                print(f"   ⏱️  Driving Hours: {metrics.get('drivingHours', 0):.2f} h")
-                print(f"   ⚡ Max Speed: {metrics.get('maxSpeed', 0):.1f} km/h")
-                print(f"   🚨 Harsh Events: {metrics.get('totalHarshEvents', 0)}")
-                print(f"   ⛽ Fuel Consumed: {metrics.get('fuelConsumption', 0):.2f} L")
+                units_data.append(self._build_unit_data(unit, messages, trips_data, events_data))
                 
             except Exception as e:
                 print(f"   ❌ Error processing unit {unit_name}: {e}")
-                units_data.append({
-                    'id': unit_id,
-                    'name': unit_name,
-                    'error': str(e),
-                    'telemetry_data': [],
-                    'metrics': {},
-                    'data_quality': {}
-                })
+                units_data.append(self._build_failed_unit_data(unit, e))
+        
+        return self._finalize_fleet_data(units, units_data, date_range, report_type)
+
+    def _extract_units_batched(self, units, time_from, time_to, batch_size, window_seconds=None):
+        """Fetch all units' calls through core/batch, several units per round trip"""
+        units_data = []
+        total_units = len(units)
+        calls_per_unit = len(self._unit_calls(0, time_from, time_to))
+        units_per_batch = max(1, batch_size // calls_per_unit)
+
+        for group_start in range(0, total_units, units_per_batch):
+            group = units[group_start:group_start + units_per_batch]
+            calls = []
+            for unit in group:
+                calls.extend(self._unit_calls(unit['id'], time_from, time_to, window_seconds))
+
+            print(f"\n📦 Fetching units {group_start + 1}-{group_start + len(group)}/{total_units} "
+                  f"in one batch ({len(calls)} calls)")
+            results = self.make_batch_request(calls, chunk_size=batch_size)
+
+            for offset, unit in enumerate(group):
+                print(f"\n📡 Processing Unit {group_start + offset + 1}/{total_units}: {unit['nm']}")
+                print("-" * 60)
+                try:
+                    unit_results = results[offset * calls_per_unit:(offset + 1) * calls_per_unit]
+                    first_result, trips_data, events_data = self._unit_payloads(unit['id'], unit_results)
+                    messages = self._stream_messages(unit['id'], time_from, time_to, first_result,
+                                                     window_seconds) \
+                        if first_result is not None or not self._messages_in_batch() else []
+                    units_data.append(self._build_unit_data(unit, messages, trips_data, events_data))
+                except Exception as e:
+                    print(f"   ❌ Error processing unit {unit['nm']}: {e}")
+                    units_data.append(self._build_failed_unit_data(unit, e))
+
+        return units_data
+
+    def extract_incremental_fleet_data(self, since, report_type="incremental"):
+        """Refresh fleet data, fetching only messages newer than each unit's watermark
+
+        ``since`` (YYYY-MM-DD) is where units without ingested telemetry start.
+        Telemetry, trips and events of earlier runs are kept on the extractor
+        and extended with the new messages, then metrics are recomputed. Units
+        whose last message (``lmsg``) is not newer than their watermark are
+        reused without any message request. Watermarks and per-unit state are
+        saved through self.watermarks, so a new process with the same
+        watermark file resumes where the last run stopped; units without
+        stored state are rebuilt from ``since``.
+        """
+        date_range = {'from': since, 'to': datetime.now().strftime("%Y-%m-%d")}
+        self._print_extraction_header(date_range, report_type)
+
+        time_from = self._time_range(date_range)[0]
+        time_to = int(time.time())
+
+        units = self.get_all_units()
+        if not units:
+            print("❌ No units found")
+            return None
+
+        self.get_drivers()
+
+        units_data = []
+        skipped = 0
+        for idx, unit in enumerate(units):
+            unit_id = unit['id']
+            state = self._incremental_state.get(unit_id) or self.watermarks.load_state(unit_id)
+            watermark = state['watermark'] if state else None
+            if state:
+                self._incremental_state[unit_id] = state
+                if watermark is not None:
+                    self.watermarks.update(unit_id, watermark)
+            last_message_time = (unit.get('lmsg') or {}).get('t')
+
+            print(f"\n📡 Processing Unit {idx + 1}/{len(units)}: {unit['nm']}")
+            print("-" * 60)
+
+            if state and watermark is not None and last_message_time is not None \
+                    and last_message_time <= watermark:
+                print("   ⏭️  No new messages since last run")
+                units_data.append(self._state_unit_data(unit, state))
+                skipped += 1
+                continue
+
+            fetch_from = watermark if watermark is not None else time_from
+            try:
+                unit_data = self._extract_unit_increment(unit, state, fetch_from, time_to)
+                units_data.append(unit_data)
+            except Exception as e:
+                print(f"   ❌ Error processing unit {unit['nm']}: {e}")
+                units_data.append(self._state_unit_data(unit, state) if state
+                                  else self._build_failed_unit_data(unit, e))
+
+        self.watermarks.save()
+        print(f"\n⏭️  {skipped}/{len(units)} units unchanged since their watermark")
+        return self._finalize_fleet_data(units, units_data, date_range, report_type)
+
+    def _state_unit_data(self, unit, state):
+        """Unit data of a stored incremental state, assembled again for state loaded from disk"""
+        if 'unit_data' not in state:
+            state['unit_data'] = self._assemble_unit_data(unit, state['telemetry_data'], state['trips_data'],
+                                                          state['events_data'])
+        return state['unit_data']
+
+    def _extract_unit_increment(self, unit, state, time_from, time_to):
+        """Append messages in [time_from, time_to] to a unit's stored data and recompute it
+
+        ``time_from`` is the watermark itself for units with state, so
+        messages of that second delivered late from a device's buffer are
+        still picked up; repeats of the stored messages of that second are
+        dropped. Events and remote trips are fetched from the end of the
+        previous run's interval, not the watermark, so none is added twice.
+        """
+        unit_id = unit['id']
+        watermark = state['watermark'] if state else None
+        seen_at_watermark = state['watermark_messages'] if state else []
+        newest = {'t': watermark, 'messages': list(seen_at_watermark)}
+
+        def track(messages):
+            for msg in messages:
+                t = msg.get('t', 0)
+                if t == watermark and msg in seen_at_watermark:
+                    continue
+                if newest['t'] is None or t > newest['t']:
+                    newest['t'], newest['messages'] = t, [msg]
+                elif t == newest['t']:
+                    newest['messages'].append(msg)
+                yield msg
+
+        print(f"📡 Extracting messages for unit {unit_id} since {time_from}...")
+        new_telemetry = self._parse_messages(unit_id, track(self._stream_messages(unit_id, time_from, time_to)))
+        others_from = state['fetched_to'] + 1 if state else time_from
+        trips_data = self.get_trips_data(unit_id, others_from, time_to) if self.remote_trips else None
+        events_data = self.get_events_data(unit_id, others_from, time_to)
+
+        if state:
+            telemetry_data = TelemetryFrame.concat([state['telemetry_data'], new_telemetry])
+            if trips_data is not None:
+                trips_data = (state['trips_data'] or []) + trips_data
+            events_data = {event_type: state['events_data'].get(event_type, []) + events
+                           for event_type, events in events_data.items()}
+            print(f"   ➕ {len(new_telemetry)} new telemetry records")
+        else:
+            telemetry_data = new_telemetry
+
+        unit_data = self._assemble_unit_data(unit, telemetry_data, trips_data, events_data)
+        state = {
+            'telemetry_data': telemetry_data,
+            'trips_data': trips_data,
+            'events_data': events_data,
+            'unit_data': unit_data,
+            'watermark': newest['t'],
+            'watermark_messages': newest['messages'],
+            'fetched_to': time_to
+        }
+        self._incremental_state[unit_id] = state
+        if newest['t'] is not None:
+            self.watermarks.update(unit_id, newest['t'])
+        self.watermarks.save_state(unit_id, state)
+        return unit_data
+
+    async def extract_comprehensive_fleet_data_async(self, date_range, report_type="weekly", concurrency=10,
+                                                     batch_size=50, window_seconds=None):
+        """Extract comprehensive fleet data with concurrent per-unit requests
+
+        All requests share one aiohttp ClientSession and at most ``concurrency``
+        of them are in flight at any time. Returns the same structure as
+        extract_comprehensive_fleet_data.
+        """
+        self._print_extraction_header(date_range, report_type)
+        print(f"⚡ Concurrency: {concurrency}")
+
+        time_from, time_to = self._time_range(date_range)
+
+        # Units and drivers populate the shared sensor/unit tables, so fetch them first
+        units = self.get_all_units()
+        if not units:
+            print("❌ No units found")
+            return None
+
+        self.get_drivers()
+
+        self._init_async_limits(concurrency)
+
+        async with self.transport.create_async_session(max_connections=concurrency) as session:
+            units_data = await asyncio.gather(
+                *(self._process_unit_async(session, unit, time_from, time_to, batch_size, window_seconds)
+                  for unit in units)
+            )
+
+        return self._finalize_fleet_data(units, list(units_data), date_range, report_type)
+
+    async def _process_unit_async(self, session, unit, time_from, time_to, batch_size=50,
+                                  window_seconds=None):
+        """Fetch and process a single unit for the async engine"""
+        try:
+            if batch_size:
+                calls = self._unit_calls(unit['id'], time_from, time_to, window_seconds)
+                results = await self.make_batch_request_async(session, calls, chunk_size=batch_size)
+                first_result, trips_data, events_data = self._unit_payloads(unit['id'], results)
+            elif self.remote_trips:
+                first_result = None
+                trips_data, events_data = await asyncio.gather(
+                    self.get_trips_data_async(session, unit['id'], time_from, time_to),
+                    self.get_events_data_async(session, unit['id'], time_from, time_to)
+                )
+            else:
+                first_result, trips_data = None, None
+                events_data = await self.get_events_data_async(session, unit['id'], time_from, time_to)
+
+            # Parse each page as it arrives
+            frames = []
+            normalizer = MessageNormalizer()
+            if first_result is not None or not batch_size or not self._messages_in_batch():
+                async for batch in self._iter_window_batches_async(session, unit['id'], time_from, time_to,
+                                                                   first_result, window_seconds):
+                    frames.append(self._parse_messages(unit['id'], normalizer.push(batch), normalize=False))
+            frames.append(self._parse_messages(unit['id'], normalizer.flush(), normalize=False))
+            self._record_repairs(unit['id'], normalizer)
+            telemetry_data = TelemetryFrame.concat(frames).sorted_by_time()
+
+            print(f"\n📡 Processed Unit: {unit['nm']} ({len(telemetry_data)} messages)")
+            return self._assemble_unit_data(unit, telemetry_data, trips_data, events_data)
+
+        except Exception as e:
+            print(f"   ❌ Error processing unit {unit['nm']}: {e}")
+            return self._build_failed_unit_data(unit, e)
+
+    def _print_extraction_header(self, date_range, report_type):
+        """Print the extraction banner"""
+        print(f"\n🚀 COMPREHENSIVE FLEET DATA EXTRACTION")
+        print(f"📅 Date Range: {date_range['from']} to {date_range['to']}")
+        print(f"📊 Report Type: {report_type}")
+        print("=" * 80)
+
+    def _time_range(self, date_range):
+        """Convert a YYYY-MM-DD date range to unix timestamps"""
+        time_from = int(datetime.strptime(date_range['from'], "%Y-%m-%d").timestamp())
+        time_to = int(datetime.strptime(date_range['to'], "%Y-%m-%d").timestamp())
+        return time_from, time_to
+
+    def _parse_messages(self, unit_id, messages, normalize=True):
+        """Parse an iterable of raw messages into a TelemetryFrame, one chunk of messages at a time
+
+        Messages are first passed through a MessageNormalizer, whose repair
+        counts are kept in self.message_repairs; pass ``normalize=False`` for
+        messages that were already normalized.
+        """
+        parser = self.get_message_parser(unit_id)
+        if normalize:
+            normalizer = MessageNormalizer()
+            messages = normalizer.normalize(messages)
+        if self._parse_pool is not None:
+            frame = self._parse_messages_in_pool(parser, messages)
+        else:
+            frame = TelemetryFrame.concat([parser.parse_batch(chunk)
+                                           for chunk in _chunked(messages, FRAME_CHUNK_SIZE)])
+        if normalize:
+            self._record_repairs(unit_id, normalizer)
+            frame = frame.sorted_by_time()
+        return frame
+
+    def _record_repairs(self, unit_id, normalizer):
+        """Keep a unit's normalization stats and report any repairs"""
+        self.message_repairs[unit_id] = dict(normalizer.stats)
+        if normalizer.repaired:
+            print(f"   🔧 Repaired {normalizer.repaired} messages "
+                  f"({normalizer.stats['duplicates']} duplicates, {normalizer.stats['reordered']} out of order)")
+
+    def _parse_messages_in_pool(self, parser, messages):
+        """Parse message chunks in the worker pool while the next pages are still being fetched"""
+        pending = deque()
+        frames = []
+        max_pending = 2 * self._parse_pool_size
+        # Pickle the parser once; workers rebuild it only the first time they see its key
+        parser_blob = pickle.dumps(parser, protocol=pickle.HIGHEST_PROTOCOL)
+        parser_key = hashlib.sha1(parser_blob).hexdigest()
+        try:
+            for chunk in _chunked(messages, FRAME_CHUNK_SIZE):
+                pending.append(self._parse_pool.submit(_parse_batch_shared, parser_key, parser_blob, chunk))
+                if len(pending) > max_pending:
+                    frames.append(TelemetryFrame.from_shared_memory(pending.popleft().result()))
+            while pending:
+                frames.append(TelemetryFrame.from_shared_memory(pending.popleft().result()))
+        finally:
+            # Release the blocks of chunks still in flight when fetching or parsing failed
+            for future in pending:
+                try:
+                    TelemetryFrame.from_shared_memory(future.result())
+                except Exception:
+                    pass
+        return TelemetryFrame.concat(frames)
+
+    def _build_unit_data(self, unit, messages, trips_data, events_data):
+        """Parse messages (any iterable, including a page stream) and assemble the per-unit result"""
+        telemetry_data = self._parse_messages(unit['id'], messages)
+        return self._assemble_unit_data(unit, telemetry_data, trips_data, events_data)
+
+    def _assemble_unit_data(self, unit, telemetry_data, trips_data, events_data):
+        """Compute metrics and data quality and assemble the per-unit result
+
+        ``trips_data`` None means trips are segmented locally from the telemetry.
+        """
+        unit_id = unit['id']
+        print(f"   ✅ Parsed {len(telemetry_data)} telemetry records")
+        
+        # All metrics in one sweep over the columns
+        unit_metrics = self._metrics_of(telemetry_data)
+        metrics = unit_metrics.summary
+        
+        if trips_data is None:
+            trips_data = self.trip_segmenter.segment(telemetry_data)
+            print(f"   🚗 Segmented {len(trips_data)} trips")
+        
+        # Store unit data
+        unit_data = {
+            'id': unit_id,
+            'name': unit['nm'],
+            'device_info': self.unit_info.get(unit_id, {}),
+            'telemetry_data': telemetry_data,
+            'trips_data': trips_data,
+            'events_data': events_data,
+            'metrics': metrics,
+            'unit_metrics': unit_metrics,
+            'last_message': telemetry_data[-1] if telemetry_data else {},
+            'data_quality': unit_metrics.quality,
+            'message_repairs': self.message_repairs.get(unit_id, {})
+        }
         
+        # Print unit summary
+        print(f"   📊 Distance: {metrics.get('totalDistance', 0):.2f} km")
+        print(f"   ⏱️  Driving Hours: {metrics.get('drivingHours', 0):.2f} h")
+        print(f"   ⚡ Max Speed: {metrics.get('maxSpeed', 0):.1f} km/h")
+        print(f"   🚨 Harsh Events: {metrics.get('totalHarshEvents', 0)}")
+        print(f"   ⛽ Fuel Consumed: {metrics.get('fuelConsumption', 0):.2f} L")
+
+        return unit_data
+
+    def _build_failed_unit_data(self, unit, error):
+        """Per-unit result for a unit that could not be processed"""
+        return {
+            'id': unit['id'],
+            'name': unit['nm'],
+            'error': str(error),
+            'telemetry_data': TelemetryFrame(),
+            'metrics': {},
+            'data_quality': {}
+        }
+
+    def _finalize_fleet_data(self, units, units_data, date_range, report_type):
+        """Build fleet summaries, write the Excel report and print the summary"""
         # Generate comprehensive report
         fleet_data = {
             'extraction_info': {
@@ -1045,6 +4450,15 @@ class EnhancedWialonExtractor:
         excel_filename = self.generate_ptt_excel_report(units_data, date_range, report_type)
         fleet_data['excel_report'] = excel_filename
         
+        fleet_data['extraction_info']['transport_stats'] = self.transport.get_stats()
+        if self.message_cache is not None:
+            fleet_data['extraction_info']['cache_stats'] = dict(self.message_cache.stats)
+        repair_stats = {'messages': 0, 'duplicates': 0, 'reordered': 0, 'late': 0}
+        for unit_data in units_data:
+            for key, count in unit_data.get('message_repairs', {}).items():
+                repair_stats[key] += count
+        fleet_data['extraction_info']['repair_stats'] = repair_stats
+        
         # Print final summary
         self.print_fleet_summary(fleet_data)
         
@@ -1052,179 +4466,20 @@ class EnhancedWialonExtractor:
 
     def calculate_comprehensive_metrics(self, telemetry_data):
         """Calculate comprehensive metrics with enhanced calculations"""
-        if not telemetry_data:
-            return {}
-        
-        # Basic distance and time calculations
-        total_distance = 0
-        if len(telemetry_data) > 1:
-            first_odometer = telemetry_data[0].odometer
-            last_odometer = telemetry_data[-1].odometer
-            total_distance = (last_odometer - first_odometer) / 1000  # Convert to km
-        
-        # Speed analysis
-        speeds = [d.speed for d in telemetry_data if d.speed > 0]
-        max_speed = max(speeds) if speeds else 0
-        avg_speed = sum(speeds) / len(speeds) if speeds else 0
-        
-        # Engine analysis
-        engine_on_count = sum(1 for d in telemetry_data if d.engine_on)
-        total_messages = len(telemetry_data)
-        engine_on_percentage = (engine_on_count / total_messages * 100) if total_messages > 0 else 0
-        
-        # Time calculations (assuming 5-second intervals)
-        driving_hours = (engine_on_count * 5) / 3600  # Convert to hours
-        total_engine_hours = driving_hours  # Simplified
-        
-        # Idling time
-        total_idling_seconds = sum(d.idling_time for d in telemetry_data)
-        total_idling_hours = total_idling_seconds / 3600
-        
-        # Harsh events
-        total_harsh_acceleration = sum(d.harsh_acceleration for d in telemetry_data)
-        total_harsh_braking = sum(d.harsh_braking for d in telemetry_data)
-        total_harsh_cornering = sum(d.harsh_cornering for d in telemetry_data)
-        total_harsh_events = total_harsh_acceleration + total_harsh_braking + total_harsh_cornering
-        
-        # Speeding violations
-        speeding_violations = sum(1 for d in telemetry_data if d.speed > 80)
-        
-        # Fuel analysis
-        fuel_levels = [d.fuel_level for d in telemetry_data if d.fuel_level > 0]
-        fuel_consumption = 0
-        if len(fuel_levels) > 1:
-            fuel_consumption = fuel_levels[0] - fuel_levels[-1]
-        
-        # CO2 emissions (rough estimate: 1L fuel = 2.31 kg CO2)
-        co2_emission = fuel_consumption * 2.31
-        
-        # Eco driving score
-        eco_driving_scores = [d.eco_driving_score for d in telemetry_data if d.eco_driving_score > 0]
-        avg_eco_score = sum(eco_driving_scores) / len(eco_driving_scores) if eco_driving_scores else 0
-        
-        # Maintenance alerts
-        all_maintenance_alerts = []
-        for d in telemetry_data:
-            all_maintenance_alerts.extend(d.maintenance_alerts)
-        unique_alerts = list(set(all_maintenance_alerts))
-        
-        return {
-            'totalDistance': total_distance,
-            'maxSpeed': max_speed,
-            'avgSpeed': avg_speed,
-            'drivingHours': driving_hours,
-            'totalEngineHours': total_engine_hours,
-            'totalIdlingTime': total_idling_hours,
-            'engineOnPercentage': engine_on_percentage,
-            'totalHarshEvents': total_harsh_events,
-            'harshAcceleration': total_harsh_acceleration,
-            'harshBraking': total_harsh_braking,
-            'harshCornering': total_harsh_cornering,
-            'speedingViolations': speeding_violations,
-            'fuelConsumption': fuel_consumption,
-            'co2Emission': co2_emission,
-            'avgEcoDrivingScore': avg_eco_score,
-            'maintenanceAlerts': unique_alerts,
-            'dataPoints': len(telemetry_data)
-        }
+        return self._metrics_of(telemetry_data).summary
 
     def assess_data_quality(self, telemetry_data):
         """Assess data quality for the unit"""
-        if not telemetry_data:
-            return {'overall_quality': 'Poor', 'issues': ['No data available']}
-        
-        total_records = len(telemetry_data)
-        issues = []
-        quality_score = 100
-        
-        # Check GPS data quality
-        valid_gps = sum(1 for d in telemetry_data if d.latitude != 0 and d.longitude != 0)
-        gps_completeness = (valid_gps / total_records) * 100
-        if gps_completeness < 90:
-            issues.append(f"GPS data only {gps_completeness:.1f}% complete")
-            quality_score -= (100 - gps_completeness) * 0.5
-        
-        # Check speed data
-        valid_speed = sum(1 for d in telemetry_data if d.speed >= 0)
-        speed_completeness = (valid_speed / total_records) * 100
-        if speed_completeness < 95:
-            issues.append(f"Speed data only {speed_completeness:.1f}% complete")
-            quality_score -= (100 - speed_completeness) * 0.3
-        
-        # Check for data gaps
-        time_gaps = self.count_significant_time_gaps(telemetry_data)
-        if time_gaps > 0:
-            issues.append(f"{time_gaps} significant time gaps detected")
-            quality_score -= time_gaps * 5
-        
-        # Check for anomalies
-        anomalies = self.detect_data_anomalies(telemetry_data)
-        if anomalies:
-            issues.extend(anomalies)
-            quality_score -= len(anomalies) * 10
-        
-        # Determine overall quality
-        if quality_score >= 90:
-            overall_quality = 'Excellent'
-        elif quality_score >= 75:
-            overall_quality = 'Good'
-        elif quality_score >= 60:
-            overall_quality = 'Fair'
-        else:
-            overall_quality = 'Poor'
-        
-        return {
-            'overall_quality': overall_quality,
-            'quality_score': max(0, quality_score),
-            'gps_completeness': gps_completeness,
-            'speed_completeness': speed_completeness,
-            'time_gaps': time_gaps,
-            'issues': issues
-        }
+        return self._metrics_of(telemetry_data).quality
 
     def count_significant_time_gaps(self, telemetry_data, threshold_minutes=10):
         """Count significant time gaps in data"""
-        if len(telemetry_data) < 2:
-            return 0
-        
-        gaps = 0
-        for i in range(1, len(telemetry_data)):
-            if telemetry_data[i].timestamp and telemetry_data[i-1].timestamp:
-                time_diff = (telemetry_data[i].timestamp - telemetry_data[i-1].timestamp).total_seconds() / 60
-                if time_diff > threshold_minutes:
-                    gaps += 1
-        
-        return gaps
+        gaps = _message_gaps(TelemetryFrame.coerce(telemetry_data)['t'])
+        return int(np.count_nonzero(gaps > threshold_minutes * 60))
 
     def detect_data_anomalies(self, telemetry_data):
         """Detect data anomalies"""
-        anomalies = []
-        
-        for data in telemetry_data:
-            # Speed anomalies
-            if data.speed < 0:
-                anomalies.append("Negative speed detected")
-                break
-            if data.speed > 200:
-                anomalies.append("Excessive speed detected (>200 km/h)")
-                break
-            
-            # GPS anomalies
-            if abs(data.latitude) > 90 or abs(data.longitude) > 180:
-                anomalies.append("Invalid GPS coordinates")
-                break
-            
-            # Power anomalies
-            if data.power_voltage > 0 and data.power_voltage < 9000:  # Below 9V
-                anomalies.append("Low power voltage detected")
-                break
-            
-            # Fuel anomalies
-            if data.fuel_level > 100:
-                anomalies.append("Fuel level >100% detected")
-                break
-        
-        return list(set(anomalies))  # Remove duplicates
+        return _first_anomaly(TelemetryFrame.coerce(telemetry_data))
 
     def calculate_fleet_summary(self, units_data):
         """Calculate fleet-wide summary metrics"""
@@ -1296,6 +4551,17 @@ class EnhancedWialonExtractor:
         print(f"🚗 Total Units: {info['total_units']}")
         print(f"✅ Successful: {info['successful_units']}")
         print(f"❌ Failed: {info['failed_units']}")
+        if info.get('transport_stats'):
+            stats = info['transport_stats']
+            print(f"🔌 Requests: {stats['requests']} "
+                  f"({stats['new_connections']} new / {stats['reused_connections']} reused connections)")
+        if info.get('cache_stats'):
+            stats = info['cache_stats']
+            print(f"💾 Message cache: {stats['hits']} days cached, {stats['misses']} fetched")
+        if info.get('repair_stats', {}).get('duplicates') or info.get('repair_stats', {}).get('reordered'):
+            stats = info['repair_stats']
+            print(f"🔧 Message repairs: {stats['duplicates']} duplicates dropped, "
+                  f"{stats['reordered']} out-of-order messages moved")
         
         # Fleet summary
         summary = fleet_data['fleet_summary']
@@ -1347,6 +4613,39 @@ def main():
     parser.add_argument('--end', type=str, help='End date (YYYY-MM-DD)', default=None)
     parser.add_argument('--report-type', type=str, choices=['daily', 'weekly', 'monthly'], 
                        default='weekly', help='Report type')
+    parser.add_argument('--concurrency', type=int, default=None,
+                       help='Process units concurrently with this many requests in flight')
+    parser.add_argument('--batch-size', type=int, default=50,
+                       help='Calls per core/batch request (0 disables batching)')
+    parser.add_argument('--sessions', type=int, default=1,
+                       help='Number of Wialon sessions to spread requests over')
+    parser.add_argument('--keepalive', type=int, default=None,
+                       help='Ping sessions every N seconds to keep them alive')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                       help='Directory for the on-disk raw message cache')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                       help='Size limit of the message cache in MB')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only fetch messages newer than each unit\'s watermark (--start is the baseline)')
+    parser.add_argument('--watermarks', type=str, default=None,
+                       help='JSON file holding per-unit watermarks for --incremental '
+                            '(unit state is kept in a .state directory next to it)')
+    parser.add_argument('--stream-decode', action='store_true',
+                       help='Decode load_interval responses incrementally instead of buffering them')
+    parser.add_argument('--window-hours', type=int, default=None,
+                       help='Fetch each unit\'s messages in parallel windows of this many hours')
+    def speed_brackets(text):
+        try:
+            return SpeedBrackets.parse(text)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    parser.add_argument('--speed-brackets', type=speed_brackets, default=None,
+                       help='Comma-separated overspeeding bracket edges in km/h (default 15,35,45,55,60,65,75,80)')
+    parser.add_argument('--remote-trips', action='store_true',
+                       help='Fetch trips with a server-side report instead of segmenting them locally')
+    parser.add_argument('--processes', type=int, default=None,
+                       help='Parse messages in this many worker processes (0 = one per CPU core)')
     
     args = parser.parse_args()
     
@@ -1357,14 +4656,32 @@ def main():
     }
     
     # Initialize extractor
-    extractor = EnhancedWialonExtractor(args.token)
+    message_cache = RawMessageCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 ** 2) \
+        if args.cache_dir else None
+    extractor = EnhancedWialonExtractor(args.token, session_pool_size=args.sessions,
+                                        message_cache=message_cache,
+                                        watermarks=WatermarkStore(args.watermarks),
+                                        stream_decode=args.stream_decode,
+                                        speed_brackets=args.speed_brackets,
+                                        remote_trips=args.remote_trips)
     
     try:
         # Login
         extractor.login_sync()
+        if args.keepalive:
+            extractor.sessions.start_keepalive(args.keepalive)
         
         # Extract comprehensive fleet data
-        fleet_data = extractor.extract_comprehensive_fleet_data(date_range, args.report_type)
+        if args.incremental:
+            with extractor.parse_processes(args.processes):
+                fleet_data = extractor.extract_incremental_fleet_data(args.start)
+        else:
+            window_seconds = args.window_hours * 3600 if args.window_hours else None
+            fleet_data = extractor.extract_comprehensive_fleet_data(date_range, args.report_type,
+                                                                    concurrency=args.concurrency,
+                                                                    batch_size=args.batch_size or None,
+                                                                    window_seconds=window_seconds,
+                                                                    processes=args.processes)
         
         if fleet_data:
             print(f"\n🎉 EXTRACTION COMPLETED SUCCESSFULLY!")
@@ -2098,11 +2098,11 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
 import json
 import time
 from datetime import datetime, timedelta
 import io
+from enhanced_wialon_extractor import WialonTransport
 
 st.set_page_config(
     page_title="PTT Fleet Management System",
@@ -2140,17 +2140,17 @@ class WorkingWialonService:
     def __init__(self):
         self.base_url = "https://hst-api.wialon.com"
         self.session_id = None
+        self.transport = WialonTransport(self.base_url)
         
     def login(self, token):
         """Login with token"""
-        url = f"{self.base_url}/wialon/ajax.html"
         params = {
             'svc': 'token/login',
             'params': json.dumps({'token': token})
         }
         
         try:
-            response = requests.post(url, data=params, timeout=30)
+            response = self.transport.post(params)
             result = response.json()
             
             if 'error' in result:
@@ -2168,7 +2168,6 @@ class WorkingWialonService:
         if not self.session_id:
             return None
             
-        url = f"{self.base_url}/wialon/ajax.html"
         data = {
             'svc': service,
             'params': json.dumps(params),
@@ -2176,7 +2175,7 @@ class WorkingWialonService:
         }
         
         try:
-            response = requests.post(url, data=data, timeout=30)
+            response = self.transport.post(data)
             result = response.json()
             
             if 'error' in result: